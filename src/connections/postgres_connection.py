@@ -12,6 +12,8 @@ class PostgresConnection:
     def __init__(self):
         self.connection_pool = None
         self.ssh_tunnel = None
+        # Connection opened by connect_postgres(), closed with the tunnel it goes through
+        self.connection = None
 
     def get_connection_params(self):
         transfer_destination = os.getenv('TRANSFER_DESTINATION', 'local').lower()
@@ -80,6 +82,9 @@ class PostgresConnection:
             self.connection_pool.putconn(conn)
     
     def close_all_connections(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
         if self.connection_pool:
             self.connection_pool.closeall()
         if self.ssh_tunnel:
@@ -87,22 +92,36 @@ class PostgresConnection:
             self.ssh_tunnel = None
             print("   → SSH tunnel closed")
 
-def connect_postgres():
+def connect_postgres(synchronous_commit=True):
+    """Open a PostgreSQL connection (through the SSH tunnel in remote mode).
+
+    With synchronous_commit=False the session commits without waiting for the WAL
+    flush. A crash can then lose the last few commits, but never a later one without
+    the earlier ones; the migration re-syncs from its checkpoint, which is saved after
+    the table's rows. Use it only for re-runnable imports.
+    """
     # Create a PostgresConnection instance to leverage SSH tunnel logic
     pg_conn = PostgresConnection()
     params = pg_conn.get_connection_params()
+    if not synchronous_commit:
+        # Applied at session start, no extra round-trip
+        params['options'] = '-c synchronous_commit=off'
 
     # Store the connection instance globally so we can close the tunnel later
     global _pg_connection_instance
     _pg_connection_instance = pg_conn
 
-    return psycopg2.connect(**params)
+    pg_conn.connection = psycopg2.connect(**params)
+    return pg_conn.connection
 
 # Global instance to manage SSH tunnel lifecycle
 _pg_connection_instance = None
 
 def close_postgres_connection():
-    """Close PostgreSQL connection and SSH tunnel if applicable"""
+    """Close the connection opened by connect_postgres() and its SSH tunnel if applicable.
+
+    This is the only place that connection is closed; callers do not close it themselves.
+    """
     global _pg_connection_instance
     if _pg_connection_instance:
         _pg_connection_instance.close_all_connections()
@@ -162,10 +181,53 @@ def parse_batch_size() -> int:
         print(f"   → Using default: {DEFAULT_BATCH_SIZE}")
         return DEFAULT_BATCH_SIZE
 
+DEFAULT_MIGRATION_WORKERS = 1
+
+
+def parse_migration_workers() -> int:
+    """
+    Parse and validate the MIGRATION_WORKERS environment variable.
+
+    Returns:
+        int: Number of worker processes per export_order tier, otherwise
+             DEFAULT_MIGRATION_WORKERS (1 = sequential migration)
+    """
+    workers_str = os.getenv('MIGRATION_WORKERS', '').strip()
+
+    if not workers_str:
+        return DEFAULT_MIGRATION_WORKERS
+
+    try:
+        workers = int(workers_str)
+        if workers <= 0:
+            print(f"⚠️  MIGRATION_WORKERS must be positive: '{workers_str}'")
+            print(f"   → Using default: {DEFAULT_MIGRATION_WORKERS}")
+            return DEFAULT_MIGRATION_WORKERS
+        return workers
+    except ValueError:
+        print(f"⚠️  Invalid MIGRATION_WORKERS format: '{workers_str}'")
+        print(f"   Expected: positive integer")
+        print(f"   → Using default: {DEFAULT_MIGRATION_WORKERS}")
+        return DEFAULT_MIGRATION_WORKERS
+
+def parse_create_source_indexes() -> bool:
+    """
+    Parse the CREATE_SOURCE_INDEXES environment variable.
+
+    Creating indexes changes the source MongoDB database, so it only happens when
+    explicitly enabled.
+
+    Returns:
+        bool: True for 'true', '1' or 'yes' (any case), otherwise False (default)
+    """
+    return os.getenv('CREATE_SOURCE_INDEXES', '').strip().lower() in ('true', '1', 'yes')
+
 def setup_tables(conn):
     try:
+        from src.schemas import get_create_all_sql
         from src.schemas.schemas import TABLE_SCHEMAS
         from src.schemas.schema_comparator import compare_table_schema, prompt_and_apply_updates
+        from src.migration.data_export import CREATE_CHECKPOINTS_SQL
 
         cursor = conn.cursor()
         print("PostgreSQL connected")
@@ -176,40 +238,45 @@ def setup_tables(conn):
         # Sort tables by export_order, same as data import
         sorted_tables = sorted(TABLE_SCHEMAS.items(), key=lambda x: x[1].export_order)
 
-        for table_name, schema in sorted_tables:
-            # Check if table exists
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables
-                    WHERE table_schema = 'public'
-                        AND table_name = %s
-                )
-            """, (table_name,))
-            table_exists = cursor.fetchone()[0]
-
-            if not table_exists:
-                # Create new table
-                cursor.execute(schema.get_create_sql())
+        # Check which tables already exist in a single round-trip
+        cursor.execute("""
+            SELECT table_name FROM information_schema.tables
+            WHERE table_schema = 'public'
+                AND table_name = ANY(%s)
+        """, ([table_name for table_name, _ in sorted_tables],))
+        existing_tables = {row[0] for row in cursor.fetchall()}
+
+        # Create every missing table with one multi-statement execute
+        missing_tables = {table_name: schema for table_name, schema in sorted_tables
+                          if table_name not in existing_tables}
+        if missing_tables:
+            cursor.execute(get_create_all_sql(missing_tables))
+            for table_name in missing_tables:
                 print(f"✅ Table {table_name} created")
+
+        for table_name, schema in sorted_tables:
+            if table_name in missing_tables:
+                continue
+            # Compare and detect differences
+            differences = compare_table_schema(schema, conn, table_name)
+
+            if differences['status'] == 'needs_update':
+                all_updates[table_name] = {
+                    'schema': schema,
+                    'differences': differences
+                }
+                print(f"⚠️  Table {table_name} needs schema update")
+            elif differences['status'] == 'error':
+                all_updates[table_name] = {
+                    'schema': schema,
+                    'differences': differences
+                }
+                print(f"❌ Table {table_name} has schema conflicts")
             else:
-                # Compare and detect differences
-                differences = compare_table_schema(schema, conn, table_name)
-
-                if differences['status'] == 'needs_update':
-                    all_updates[table_name] = {
-                        'schema': schema,
-                        'differences': differences
-                    }
-                    print(f"⚠️  Table {table_name} needs schema update")
-                elif differences['status'] == 'error':
-                    all_updates[table_name] = {
-                        'schema': schema,
-                        'differences': differences
-                    }
-                    print(f"❌ Table {table_name} has schema conflicts")
-                else:
-                    print(f"✅ Table {table_name} schema up to date")
+                print(f"✅ Table {table_name} schema up to date")
 
+        # Incremental sync checkpoints, read by get_last_insert_date()
+        cursor.execute(CREATE_CHECKPOINTS_SQL)
         conn.commit()
 
         # If updates needed, show diff and ask confirmation
@@ -1,4 +1,4 @@
-from src.schemas.schemas import TABLE_SCHEMAS
+from src.schemas.schemas import TABLE_SCHEMAS, get_import_strategy
 from bson import ObjectId
 import psycopg2
 from src.connections.mongo_connection import get_mongo_collection
@@ -8,6 +8,14 @@ from datetime import datetime
 # Global instance for backward compatibility
 import_summary = ImportSummary()
 
+CREATE_CHECKPOINTS_SQL = """
+    CREATE TABLE IF NOT EXISTS migration_checkpoints (
+        table_name VARCHAR PRIMARY KEY,
+        last_sync_at TIMESTAMP NOT NULL
+    )
+"""
+
+
 def get_last_insert_date(conn, table_name):
 
     #datetime_str = str('28/08/25 00:00:00')
@@ -15,7 +23,29 @@ def get_last_insert_date(conn, table_name):
 
     #return datetime_object
 
-    """Get the latest created_at or updated_at date from a table to use as starting point for incremental imports"""
+    """Get the date to resume an incremental import from.
+
+    Reads the table's row in migration_checkpoints. A checkpoint is ignored while the table
+    is empty (truncated or dropped outside the migration), so the table is imported in full.
+    Tables without a checkpoint yet fall back to the latest created_at or updated_at date
+    of the table itself.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT last_sync_at FROM migration_checkpoints "
+            f"WHERE table_name = %s AND EXISTS (SELECT 1 FROM {table_name})",
+            (table_name,),
+        )
+        result = cursor.fetchone()
+        if result and result[0]:
+            return result[0]
+    except psycopg2.Error as e:
+        print(f"Error reading migration checkpoint for {table_name}: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+
     cursor = conn.cursor()
     try:
         # Get the maximum of both created_at and updated_at to catch both new and updated records
@@ -37,6 +67,49 @@ def get_last_insert_date(conn, table_name):
     finally:
         cursor.close()
 
+def save_sync_checkpoint(conn, table_name, last_sync_at):
+    """Record last_sync_at for table_name; a checkpoint never moves backwards"""
+    if last_sync_at is None:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO migration_checkpoints (table_name, last_sync_at) VALUES (%s, %s)
+            ON CONFLICT (table_name) DO UPDATE
+            SET last_sync_at = GREATEST(migration_checkpoints.last_sync_at, EXCLUDED.last_sync_at)
+        """, (table_name, last_sync_at))
+        conn.commit()
+    except psycopg2.Error as e:
+        print(f"Error saving migration checkpoint for {table_name}: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+
+def delete_sync_checkpoints(conn, table_name, commit=True):
+    """Forget the checkpoints of table_name and of every table TRUNCATE ... CASCADE empties with it.
+
+    With commit=False the DELETE stays in the open transaction, so it commits with the truncate.
+    """
+    cursor = conn.cursor()
+    try:
+        # Tables referencing table_name through foreign keys, followed transitively
+        cursor.execute("""
+            WITH RECURSIVE cascaded(relid) AS (
+                SELECT %s::regclass::oid
+                UNION
+                SELECT con.conrelid FROM pg_constraint con
+                JOIN cascaded ON con.confrelid = cascaded.relid
+                WHERE con.contype = 'f'
+            )
+            DELETE FROM migration_checkpoints
+            WHERE table_name IN (SELECT relname FROM pg_class JOIN cascaded ON pg_class.oid = cascaded.relid)
+        """, (table_name,))
+        if commit:
+            conn.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
 def print_import_summary(entities=None, summary_instance=None):
     """Print a summary of import statistics by entity
     
@@ -63,9 +136,11 @@ def export_table_data(conn, table_name, collection, custom_filter=None, summary_
     )
     
     # Use strategy from schema or default to DirectTranslationStrategy
-    strategy = getattr(schema, 'import_strategy', None) or DirectTranslationStrategy()
+    strategy = get_import_strategy(schema) or DirectTranslationStrategy()
     
-    return strategy.export_data(conn, collection, config)
+    result = strategy.export_data(conn, collection, config)
+    save_sync_checkpoint(conn, table_name, config.last_seen_date)
+    return result
 
 
 
@@ -11,7 +11,8 @@ STEP 1: Get Last Migration Date
 
 STEP 2: Query New/Updated Documents
     - Query MongoDB for documents created or updated after the last migration date
-    - Implementation: strategy.count_total_documents() and strategy.get_documents()
+    - Implementation: strategy.iter_document_batches(); a table whose first batch is empty is skipped
+    - Strategies declaring get_document_query() stream one cursor; get_documents() overrides are paged by _id
     - Uses MongoRepository.build_date_filter() to construct MongoDB query with $gte operator
     - Filter: {$or: [{creation_date: {$gte: date}}, {update_date: {$gte: date}}]}
     - Purpose: Fetch only changed data since last migration
@@ -20,7 +21,8 @@ STEP 3: Transform Data
     - Convert MongoDB documents to PostgreSQL-compatible row data
     - Implementation: strategy.extract_data_for_sql()
     - Handles ObjectId conversion, field mapping, and data type transformation
-    - Returns: (values, columns) tuple for SQL insertion
+    - Returns: (rows, columns) tuple for SQL insertion; rows is always a list of rows,
+      even for a single-row document, or None to skip the document
     - Purpose: Adapt document structure to relational schema
 
 STEP 4: Execute Import
@@ -83,10 +85,17 @@ Configuration:
   * True: Faster but requires rollback on any error
   * False: Slower but isolates errors to individual records
 
+- PREFETCH_BATCHES (int): Document batches a reader thread fetches ahead of the writes
+  * Overlaps MongoDB reads with PostgreSQL writes; 0 reads each batch inline
+
 - DIRECT_IMPORT (bool): Execute SQL directly (True) or generate SQL files (False)
   * True: Immediate execution with real-time error handling
   * False: Generate .sql files for review/manual execution
 
+- COUNT_DOCUMENTS_FOR_PROGRESS (bool): Count matching documents before export (True) or not (False)
+  * True: Progress lines show processed/total, at the cost of one filtered count per table
+  * False: Progress lines show processed/?; ingestion starts with the first fetch
+
 Error Handling:
 
 - Batch failures trigger automatic fallback to individual insert retry
@@ -100,13 +109,18 @@ Performance:
 - Default batch size: 5000 documents per query
 - Parallel document processing within batches
 - Connection pooling for PostgreSQL
-- Efficient MongoDB cursor-based pagination
-- Progress tracking with real-time console output
+- One streamed MongoDB cursor per table, read in batch_size batches
+- Progress tracking with real-time console output (no up-front count unless requested)
 """
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Callable, Any
+from datetime import datetime
+import inspect
+import queue
+import threading
+from types import MappingProxyType
+from typing import List, Mapping, Optional, Callable, Any
 from bson import ObjectId
 from src.migration.repositories.mongo_repo import MongoRepository
 from src.migration.repositories.postgres_repo import PostgresRepository
@@ -115,6 +129,82 @@ from src.migration.repositories.postgres_repo import PostgresRepository
 IMPORT_BY_BATCH = True
 # Control whether to execute SQL directly (True) or generate SQL files (False)
 DIRECT_IMPORT = True
+# Control whether to count documents up front so progress shows processed/total (one extra scan per table)
+COUNT_DOCUMENTS_FOR_PROGRESS = False
+# Document batches read from MongoDB ahead of the PostgreSQL writes (0 reads them inline)
+PREFETCH_BATCHES = 2
+
+_PREFETCH_DONE = object()
+
+
+def array_item_id(item, embedded_key: str) -> str:
+    """Return the referenced id of an array entry: a bare ObjectId or an embedded document.
+
+    Embedded documents hold the id under embedded_key, falling back to their own _id.
+    """
+    # Bare ObjectIds are the common shape; test for them first instead of probing for .get
+    if isinstance(item, ObjectId):
+        return str(item)
+    if hasattr(item, 'get'):
+        return str(item.get(embedded_key, item.get('_id', item)))
+    return str(item)
+
+
+def prefetch_batches(batches, depth: int):
+    """Yield from batches while a reader thread fetches up to depth batches ahead.
+
+    MongoDB reads then overlap the PostgreSQL writes of the batch being exported. An error
+    raised while reading is re-raised here; closing this generator stops the reader.
+    """
+    if depth <= 0:
+        yield from batches
+        return
+
+    buffer = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item):
+        # Give up once the consumer is gone instead of blocking on a full queue forever
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read():
+        try:
+            for batch in batches:
+                if not put(batch):
+                    break
+            else:
+                put(_PREFETCH_DONE)
+        except Exception as error:
+            put(error)
+        finally:
+            if hasattr(batches, 'close'):
+                batches.close()
+
+    reader = threading.Thread(target=read, name="mongo-prefetch", daemon=True)
+    reader.start()
+    try:
+        while (item := buffer.get()) is not _PREFETCH_DONE:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+        reader.join()
+
+
+def latest_document_date(documents, latest: Optional[datetime] = None) -> Optional[datetime]:
+    """Return the latest creation_date/update_date among documents, starting from latest"""
+    for document in documents:
+        for value in (document.get('creation_date'), document.get('update_date')):
+            if isinstance(value, datetime) and (latest is None or value > latest):
+                latest = value
+    return latest
 
 
 @dataclass
@@ -125,23 +215,75 @@ class ImportConfig:
     after_date: Optional[Any] = None
     custom_filter: Optional[Callable] = None
     summary_instance: Optional[Any] = None
+    # Latest creation/update date of the exported documents, filled in by export_data()
+    last_seen_date: Optional[datetime] = None
 
 
 class ImportStrategy(ABC):
+    def __new__(cls, *args, **kwargs):
+        # Like an abstract method, but either of two methods satisfies it: fail when the
+        # strategy is built rather than when the migration reaches its table
+        if (cls.get_document_query is ImportStrategy.get_document_query
+                and cls.get_documents is ImportStrategy.get_documents):
+            raise TypeError(
+                f"Can't instantiate {cls.__name__}: override get_document_query() or get_documents()"
+            )
+        return super().__new__(cls)
+
     @abstractmethod
     def count_total_documents(self, collection, config: ImportConfig) -> int:
         """Count total documents that will be processed"""
         pass
     
-    @abstractmethod
-    def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-        """Get documents for processing with pagination"""
-        pass
+    def get_document_query(self, config: ImportConfig):
+        """Return (filter, projection) of the single find() feeding this strategy, or None.
+
+        The date filter is added by the caller. Strategies that cannot express their
+        documents as one query return None and override get_documents() instead.
+        """
+        return None
+
+    def get_documents(self, collection, config: ImportConfig, after_id=None):
+        """Get up to config.batch_size documents with _id greater than after_id, sorted by _id.
+
+        Return a list: the default iter_document_batches() takes its len() to detect the last page
+        and resumes after the _id of its last document.
+        """
+        # Construction guarantees get_document_query() is overridden when this method is not
+        mongo_filter, projection = self.get_document_query(config)
+        return MongoRepository.find_documents(
+            collection,
+            after_date=config.after_date,
+            extra_filter=mongo_filter,
+            projection=projection,
+            after_id=after_id,
+            limit=config.batch_size,
+        )
     
     @abstractmethod
     def extract_data_for_sql(self, document, config: ImportConfig):
-        """Extract and prepare data from a single document for SQL insertion"""
+        """Extract the rows of a single document for SQL insertion.
+
+        Return (rows, columns) where rows is a list of rows (one-element for 1:1 tables),
+        or (None, None) to skip the document.
+        """
         pass
+
+    def extract_batch_for_sql(self, documents, config: ImportConfig):
+        """Extract the rows of a whole batch; return (rows, columns of the first extracted document).
+
+        The default calls extract_data_for_sql() per document. Override when per-batch
+        work such as schema lookup can be hoisted out of the loop.
+        """
+        batch_values = []
+        columns = None
+        for doc in documents:
+            values, doc_columns = self.extract_data_for_sql(doc, config)
+            if values is not None:
+                if columns is None:
+                    columns = doc_columns
+                batch_values.extend(values)
+        return batch_values, columns
     
     def get_use_on_conflict(self) -> bool:
         """Override in subclasses if ON CONFLICT clause is needed"""
@@ -174,7 +316,56 @@ class ImportStrategy(ABC):
     def get_progress_message(self, processed: int, total: int, table_name: str, **kwargs) -> str:
         """Override in subclasses for custom progress messages"""
         return f"Processed {processed}/{total} documents for {table_name}"
+
+    def get_progress_total(self, collection, config: ImportConfig):
+        """Total shown in progress messages: '?' unless COUNT_DOCUMENTS_FOR_PROGRESS is enabled"""
+        if not COUNT_DOCUMENTS_FOR_PROGRESS:
+            return '?'
+        return self.count_total_documents(collection, config)
+
+    def prepare_batch(self, documents, config: ImportConfig):
+        """Hook called once per fetched batch before extract_data_for_sql. Override to prefetch data."""
+        pass
+
+    def iter_document_batches(self, collection, config: ImportConfig):
+        """Yield the documents to process in batches of config.batch_size.
+
+        Strategies described by get_document_query() are streamed from one cursor.
+        When get_documents() is overridden it is paged through by _id (keyset pagination)
+        instead, so the override is honoured.
+        """
+        query = self.get_document_query(config)
+        if query is not None and type(self).get_documents is ImportStrategy.get_documents:
+            mongo_filter, projection = query
+            yield from MongoRepository.iter_document_batches(
+                collection,
+                after_date=config.after_date,
+                extra_filter=mongo_filter,
+                projection=projection,
+                batch_size=config.batch_size,
+            )
+            return
+
+        after_id = None
+        while True:
+            documents = self.get_documents(collection, config, after_id)
+            if not documents:
+                return
+            yield documents
+            if len(documents) < config.batch_size:
+                return
+            after_id = documents[-1]['_id']
     
+    def iter_export_batches(self, collection, config: ImportConfig):
+        """Yield the batches export_data() writes, read ahead of the writes.
+
+        A batch's dates count towards config.last_seen_date only once the caller has
+        finished with it, so a failed export never reports documents it did not write.
+        """
+        for documents in prefetch_batches(self.iter_document_batches(collection, config), PREFETCH_BATCHES):
+            yield documents
+            config.last_seen_date = latest_document_date(documents, config.last_seen_date)
+
     def export_data(self, conn, collection, config: ImportConfig):
         """Generic export implementation that works for both strategies"""
         import os
@@ -190,32 +381,15 @@ class ImportStrategy(ABC):
         if not DIRECT_IMPORT:
             os.makedirs("sql_exports", exist_ok=True)
 
-        # Get total count for progress tracking
-        total_docs = self.count_total_documents(collection, config)
+        # Progress total; documents are not counted up front unless explicitly enabled
+        total_docs = self.get_progress_total(collection, config)
         processed_docs = 0
         total_records = 0
         
         # Process documents in batches
-        offset = 0
-        while True:
-            documents = self.get_documents(collection, config, offset)
-            
-            if not documents:
-                break
-            
-            batch_values = []
-            columns = None
-            
-            for doc in documents:
-                values, doc_columns = self.extract_data_for_sql(doc, config)
-                if values is not None:
-                    if columns is None:
-                        columns = doc_columns
-                    # Handle both single records and multiple records per document
-                    if isinstance(values, list) and len(values) > 0 and isinstance(values[0], list):
-                        batch_values.extend(values)
-                    else:
-                        batch_values.append(values)
+        for documents in self.iter_export_batches(collection, config):
+            self.prepare_batch(documents, config)
+            batch_values, columns = self.extract_batch_for_sql(documents, config)
             
             if batch_values:
                 actual_insertions = postgres_repo.execute_batch(
@@ -238,10 +412,6 @@ class ImportStrategy(ABC):
                     print(f"Generated SQL for {total_records} records from {processed_docs + len(documents)}/{total_docs} documents for {config.table_name}")
             
             processed_docs += len(documents)
-            offset += config.batch_size
-            
-            if len(documents) < config.batch_size:
-                break
         
         action = "processing" if DIRECT_IMPORT else "SQL generation for"
         print(f"Completed {action} {total_records} records from {processed_docs} documents for {config.table_name}")
@@ -263,14 +433,17 @@ class DirectTranslationStrategy(ImportStrategy):
         """Count total documents that will be processed"""
         return MongoRepository.count_documents(collection, config.after_date)
     
-    def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-        """Get documents for processing with pagination"""
-        return MongoRepository.find_documents(
-            collection,
-            after_date=config.after_date,
-            offset=offset,
-            limit=config.batch_size,
-        )
+    def get_document_query(self, config: ImportConfig):
+        """Every document of the source collection, projected on the schema's mapped fields.
+
+        A custom_filter or an extract_data_for_sql override may read any field,
+        so those fetch whole documents.
+        """
+        from src.schemas.schemas import TABLE_SCHEMAS
+
+        if config.custom_filter or type(self).extract_data_for_sql is not DirectTranslationStrategy.extract_data_for_sql:
+            return {}, None
+        return {}, TABLE_SCHEMAS[config.table_name].projection
     
     def extract_data_for_sql(self, document, config: ImportConfig):
         """Extract and prepare data from a single document for SQL insertion"""
@@ -280,26 +453,22 @@ class DirectTranslationStrategy(ImportStrategy):
         
         if config.custom_filter and not config.custom_filter(document):
             return None, None
-            
-        values = []
-        columns = []
-        
-        for mongo_field, pg_field in schema.field_mappings.items():
-            columns.append(pg_field)
-            
-            if mongo_field == '_id':
-                value = str(document['_id'])
-            elif mongo_field in document:
-                value = document[mongo_field]
-                if isinstance(value, ObjectId):
-                    value = str(value)
-            else:
-                # Handle missing fields by setting to None (NULL in PostgreSQL)
-                value = None
-                
-            values.append(value)
-        
-        return values, columns
+
+        return [schema.resolve(document)], schema.mapped_columns
+
+    def extract_batch_for_sql(self, documents, config: ImportConfig):
+        """Resolve every document of the batch with one schema lookup"""
+        from src.schemas.schemas import TABLE_SCHEMAS
+
+        if type(self).extract_data_for_sql is not DirectTranslationStrategy.extract_data_for_sql:
+            # A subclass reshapes single documents; keep calling it
+            return super().extract_batch_for_sql(documents, config)
+
+        schema = TABLE_SCHEMAS[config.table_name]
+        if config.custom_filter:
+            documents = filter(config.custom_filter, documents)
+        batch_values = list(map(schema.resolve, documents))
+        return batch_values, (schema.mapped_columns if batch_values else None)
     
     def get_use_on_conflict(self) -> bool:
         """Use ON CONFLICT for tables with primary keys or unique constraints"""
@@ -317,17 +486,52 @@ class ArrayExtractionConfig:
     parent_collection: str
     array_field: str
     child_collection: str = None
-    parent_filter_fields: Dict[str, str] = None
-    child_projection_fields: Dict[str, str] = None
+    parent_filter_fields: Mapping[str, Any] = None
+    child_projection_fields: Mapping[str, Any] = None
     sql_columns: List[str] = None
     value_transformer: Optional[Callable] = None
 
+    def __post_init__(self):
+        # Projections are sent with every find(); build them once and keep them read-only.
+        # The dates feed ImportConfig.last_seen_date, i.e. the table's sync checkpoint; a custom
+        # projection leaving them out gets no checkpoint and resumes from MAX(created_at/updated_at)
+        if self.parent_filter_fields is None:
+            self.parent_filter_fields = {'_id': 1, self.array_field: 1, 'creation_date': 1, 'update_date': 1}
+        self.parent_filter_fields = MappingProxyType(dict(self.parent_filter_fields))
+        if self.child_projection_fields is not None:
+            self.child_projection_fields = MappingProxyType(dict(self.child_projection_fields))
+        self._check_row_arity()
+
+    def _check_row_arity(self):
+        """Fail at construction, not mid-import, when rows and sql_columns cannot line up.
+
+        Custom transformers are never called here: their signature must accept
+        (parent_id, child_doc), but their row length is only known at import time.
+        """
+        if self.value_transformer is not None:
+            try:
+                inspect.signature(self.value_transformer).bind('parent_id', {})
+            except TypeError:
+                raise ValueError(
+                    f"Transformer for {self.parent_collection}.{self.array_field} "
+                    f"must accept (parent_id, child_doc)"
+                ) from None
+            return
+        # ArrayExtractionStrategy._default_transform builds 4-value rows
+        if self.sql_columns and len(self.sql_columns) != 4:
+            raise ValueError(
+                f"Default transformer for {self.parent_collection}.{self.array_field} returns 4 "
+                f"values but sql_columns lists {len(self.sql_columns)}"
+            )
+
 
 class ArrayExtractionStrategy(ImportStrategy):
     """Handles complex array-based imports that extract from parent document arrays"""
     
     def __init__(self, extraction_config: ArrayExtractionConfig):
         self.config = extraction_config
+        # Child documents prefetched for the current batch (None = fetch per parent)
+        self._child_docs = None
     
     def count_total_documents(self, collection, config: ImportConfig) -> int:
         """Count total parent documents that will be processed"""
@@ -339,26 +543,82 @@ class ArrayExtractionStrategy(ImportStrategy):
         
         return parent_collection.count_documents(parent_filter)
     
-    def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-        """Get parent documents for processing with pagination"""
+    def get_documents(self, collection, config: ImportConfig, after_id=None):
+        """Get parent documents for processing with keyset pagination"""
         from src.connections.mongo_connection import get_mongo_collection
         
         parent_collection = get_mongo_collection(self.config.parent_collection)
         parent_filter = {self.config.array_field: {'$exists': True, '$ne': []}}
         parent_filter.update(MongoRepository.build_date_filter(config.after_date))
+        parent_filter.update(MongoRepository.build_keyset_filter(after_id))
         
         return list(parent_collection.find(
             parent_filter,
-            self.config.parent_filter_fields or {'_id': 1, self.config.array_field: 1}
-        ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            self.config.parent_filter_fields
+        ).sort('_id', 1).limit(config.batch_size))
+
+    def iter_document_batches(self, collection, config: ImportConfig):
+        """Stream parent documents from one cursor instead of re-querying with skip() offsets"""
+        from src.connections.mongo_connection import get_mongo_collection
+
+        if type(self).get_documents is not ArrayExtractionStrategy.get_documents:
+            # A subclass filters or reshapes documents in get_documents(); page through it
+            return super().iter_document_batches(collection, config)
+
+        return MongoRepository.iter_document_batches(
+            get_mongo_collection(self.config.parent_collection),
+            after_date=config.after_date,
+            extra_filter={self.config.array_field: {'$exists': True, '$ne': []}},
+            projection=self.config.parent_filter_fields,
+            batch_size=config.batch_size,
+        )
     
+    def prepare_batch(self, documents, config: ImportConfig):
+        """Fetch every referenced child of the batch with a single $in query instead of one per parent"""
+        from src.connections.mongo_connection import get_mongo_collection
+
+        self._child_docs = None
+        if not self.config.child_collection:
+            return
+
+        child_ids = []
+        for document in documents:
+            array_items = document.get(self.config.array_field, [])
+            # Embedded documents are processed directly, no lookup needed
+            if array_items and not isinstance(array_items[0], dict):
+                child_ids.extend(array_items)
+
+        self._child_docs = {}
+        if not child_ids:
+            return
+
+        # Parents can reference many children each; keep every $in list within batch_size
+        unique_ids = list(dict.fromkeys(child_ids))
+        child_collection = get_mongo_collection(self.config.child_collection)
+        for start in range(0, len(unique_ids), config.batch_size):
+            child_cursor = child_collection.find(
+                {'_id': {'$in': unique_ids[start:start + config.batch_size]}},
+                self.config.child_projection_fields
+            )
+            for child_doc in child_cursor:
+                self._child_docs[child_doc['_id']] = child_doc
+
+    def export_data(self, conn, collection, config: ImportConfig):
+        try:
+            return super().export_data(conn, collection, config)
+        finally:
+            # The strategy instance is shared across runs; do not keep the last batch's children alive
+            self._child_docs = None
+
     def extract_data_for_sql(self, document, config: ImportConfig):
         """Extract and prepare data from a single parent document for SQL insertion"""
         from src.connections.mongo_connection import get_mongo_collection
         from .import_summary import ImportSummary
         
         summary = config.summary_instance or ImportSummary()
-        child_collection = get_mongo_collection(self.config.child_collection) if self.config.child_collection else None
+        child_collection = None
+        if self.config.child_collection and self._child_docs is None:
+            child_collection = get_mongo_collection(self.config.child_collection)
         
         parent_id = str(document['_id'])
         array_items = document.get(self.config.array_field, [])
@@ -369,7 +629,7 @@ class ArrayExtractionStrategy(ImportStrategy):
         # Build values for all children of this parent
         batch_values = []
         
-        if child_collection is not None:
+        if self.config.child_collection:
             # Traditional case: array contains ObjectIds referencing separate documents
             # Check if array_items contains ObjectIds or embedded documents
             if array_items and isinstance(array_items[0], dict):
@@ -383,13 +643,17 @@ class ArrayExtractionStrategy(ImportStrategy):
             else:
                 # Array contains ObjectIds
                 child_ids = array_items
-                children_docs = {}
-                child_cursor = child_collection.find(
-                    {'_id': {'$in': child_ids}},
-                    self.config.child_projection_fields
-                )
-                for child_doc in child_cursor:
-                    children_docs[child_doc['_id']] = child_doc
+                if self._child_docs is not None:
+                    # Already fetched for the whole batch by prepare_batch
+                    children_docs = self._child_docs
+                else:
+                    children_docs = {}
+                    child_cursor = child_collection.find(
+                        {'_id': {'$in': child_ids}},
+                        self.config.child_projection_fields
+                    )
+                    for child_doc in child_cursor:
+                        children_docs[child_doc['_id']] = child_doc
                 
                 for child_id in child_ids:
                     if child_id in children_docs:
@@ -423,12 +687,13 @@ class ArrayExtractionStrategy(ImportStrategy):
     
     def _default_transform(self, parent_id, child_doc):
         """Default transformation - override with custom transformer if needed"""
-        return [
+        # Rows are built once and never mutated, so a tuple is enough
+        return (
             str(child_doc['_id']),
             parent_id,
             child_doc.get('creation_date'),
             child_doc.get('update_date')
-        ]
+        )
 
 
 class DeleteAndInsertStrategy(ImportStrategy):
@@ -444,11 +709,14 @@ class DeleteAndInsertStrategy(ImportStrategy):
     1. Get last migration date (handled by transfert_data.py)
     2. Query changed documents (implemented by subclasses)
     3. Extract relationship data (implemented by subclasses)
-    4. Delete old + Insert fresh relationships (handled here)
+    4. Delete relationships missing from the fresh set + upsert the fresh ones (handled here)
+
+    Step 4 merges on get_conflict_keys(), so relationships that did not change are not
+    rewritten. Tables without a unique key fall back to deleting every relationship of
+    the changed parents and inserting them all again.
 
     Subclasses must implement:
-    - count_total_documents(): Count documents with changes
-    - get_documents(): Fetch changed documents with pagination
+    - get_document_query() (or get_documents() paged by after_id)
     - extract_data_for_sql(): Transform document to SQL rows
     - get_parent_id_from_document(): Extract parent entity ID
     - get_delete_table_name(): Table name for deletion
@@ -470,13 +738,22 @@ class DeleteAndInsertStrategy(ImportStrategy):
         """Return the column name to use in DELETE WHERE clause (e.g., 'user_id')"""
         pass
 
+    def get_conflict_keys(self, config: ImportConfig) -> Optional[List[str]]:
+        """Return the columns identifying one relationship (the table's first unique constraint), or None"""
+        from src.schemas.schemas import TABLE_SCHEMAS
+
+        schema = TABLE_SCHEMAS.get(config.table_name)
+        if schema is None or not schema.unique_constraints:
+            return None
+        return list(schema.unique_constraints[0])
+
     def export_data(self, conn, collection, config: ImportConfig):
         """
-        Template method implementing the 4-step delete-and-insert pattern:
+        Template method implementing the 4-step relationship sync:
         1. Query changed documents (via get_documents)
         2. Extract relationship data (via extract_data_for_sql)
-        3. Delete existing relationships for changed parents
-        4. Insert fresh relationships
+        3. Delete stale relationships of changed parents
+        4. Upsert fresh relationships (full delete+insert fallback without a unique key)
         """
         import os
 
@@ -493,19 +770,13 @@ class DeleteAndInsertStrategy(ImportStrategy):
         if not DIRECT_IMPORT:
             os.makedirs("sql_exports", exist_ok=True)
 
-        # Get total count for progress tracking
-        total_docs = self.count_total_documents(collection, config)
+        # Progress total; documents are not counted up front unless explicitly enabled
+        total_docs = self.get_progress_total(collection, config)
         processed_docs = 0
         total_records = 0
 
         # Process documents in batches
-        offset = 0
-        while True:
-            documents = self.get_documents(collection, config, offset)
-
-            if not documents:
-                break
-
+        for documents in self.iter_export_batches(collection, config):
             batch_values = []
             columns = None
             batch_parent_ids = []
@@ -519,25 +790,28 @@ class DeleteAndInsertStrategy(ImportStrategy):
 
                     parent_id = self.get_parent_id_from_document(doc)
                     batch_parent_ids.append(parent_id)
+                    batch_values.extend(values)
 
-                    # Handle both single records and multiple records per document
-                    if isinstance(values, list) and len(values) > 0 and isinstance(values[0], list):
-                        batch_values.extend(values)
-                    else:
-                        batch_values.append(values)
+            conflict_keys = self.get_conflict_keys(config)
+            merge = conflict_keys is not None and (not batch_values or set(conflict_keys) <= set(columns))
 
-            # Step 3: Delete existing relationships for changed parents
+            # Step 3: Delete relationships of changed parents (committed with the insert)
             if batch_parent_ids and DIRECT_IMPORT:
-                self._delete_existing_relationships(postgres_repo, batch_parent_ids, config)
+                if merge:
+                    self._delete_stale_relationships(
+                        postgres_repo, batch_parent_ids, conflict_keys, columns, batch_values, config
+                    )
+                else:
+                    self._delete_existing_relationships(postgres_repo, batch_parent_ids, config)
 
-            # Step 4: Insert fresh relationships
+            # Step 4: Upsert fresh relationships (plain insert after a full delete)
             if batch_values:
                 actual_insertions = postgres_repo.execute_batch(
                     batch_values,
                     columns,
                     config.table_name,
-                    use_on_conflict=False,
-                    on_conflict_clause="",
+                    use_on_conflict=merge,
+                    on_conflict_clause=self._get_merge_clause(config, columns, conflict_keys) if merge else "",
                 )
                 total_records += actual_insertions
 
@@ -550,11 +824,11 @@ class DeleteAndInsertStrategy(ImportStrategy):
                 else:
                     print(f"Generated SQL for {total_records} records from {processed_docs + len(documents)}/{total_docs} documents for {config.table_name}")
 
-            processed_docs += len(documents)
-            offset += config.batch_size
+            # execute_batch commits the DELETE along with the rows; this covers batches with nothing to insert
+            if batch_parent_ids and DIRECT_IMPORT:
+                conn.commit()
 
-            if len(documents) < config.batch_size:
-                break
+            processed_docs += len(documents)
 
         action = "processing" if DIRECT_IMPORT else "SQL generation for"
         print(f"Completed incremental {action} {total_records} records from {processed_docs} documents for {config.table_name}")
@@ -575,17 +849,50 @@ class DeleteAndInsertStrategy(ImportStrategy):
         table_name = self.get_delete_table_name(config)
         column_name = self.get_delete_column_name()
         try:
+            # Left uncommitted: one transaction per batch, and readers never see a parent
+            # whose relationships are deleted but not yet re-inserted
             deleted_count = postgres_repo.delete_by_parent_ids(
                 table_name,
                 column_name,
                 parent_ids,
+                commit=False,
             )
             print(f"Deleted {deleted_count} existing relationships for {len(parent_ids)} updated parents")
         except Exception as e:
             print(f"Error deleting existing relationships: {e}")
 
+    def _delete_stale_relationships(self, postgres_repo, parent_ids: List[str], conflict_keys: List[str],
+                                    columns, batch_values, config: ImportConfig):
+        """Delete relationships of the specified parents that are absent from the fresh rows"""
+        if batch_values:
+            key_indexes = [columns.index(key) for key in conflict_keys]
+            kept_keys = {tuple(row[index] for index in key_indexes) for row in batch_values}
+        else:
+            kept_keys = set()
+        try:
+            deleted_count = postgres_repo.delete_stale_relationships(
+                self.get_delete_table_name(config),
+                self.get_delete_column_name(),
+                parent_ids,
+                conflict_keys,
+                kept_keys,
+                commit=False,
+            )
+            print(f"Deleted {deleted_count} stale relationships for {len(parent_ids)} updated parents")
+        except Exception as e:
+            print(f"Error deleting stale relationships: {e}")
+
+    def _get_merge_clause(self, config: ImportConfig, columns, conflict_keys: List[str]) -> str:
+        """ON CONFLICT clause of the table's schema, which leaves unchanged relationships alone"""
+        from src.schemas.schemas import TABLE_SCHEMAS
+
+        schema = TABLE_SCHEMAS.get(config.table_name)
+        if schema is None:
+            return f" ON CONFLICT ({', '.join(conflict_keys)}) DO NOTHING"
+        return schema.get_on_conflict_clause(columns)
+
     def get_use_on_conflict(self) -> bool:
-        """Delete-and-insert doesn't use ON CONFLICT"""
+        """Not consulted by export_data, which upserts whenever get_conflict_keys() finds a unique key"""
         return False
 
 
@@ -608,8 +915,7 @@ class SmartDiffStrategy(ImportStrategy):
     - For changes <= 30%, computes and applies only differences
 
     Subclasses must implement:
-    - count_total_documents(): Count documents with changes
-    - get_documents(): Fetch changed documents with pagination
+    - get_document_query() (or get_documents() paged by after_id)
     - extract_data_for_sql(): Transform document to SQL rows
     - get_parent_id_from_document(): Extract parent entity ID
     - get_child_column_name(): Column name for child entity ID (e.g., 'target_id')
@@ -690,8 +996,8 @@ class SmartDiffStrategy(ImportStrategy):
         if not DIRECT_IMPORT:
             os.makedirs("sql_exports", exist_ok=True)
 
-        # Get total count for progress tracking
-        total_docs = self.count_total_documents(collection, config)
+        # Progress total; documents are not counted up front unless explicitly enabled
+        total_docs = self.get_progress_total(collection, config)
         processed_docs = 0
         total_records_inserted = 0
         total_records_deleted = 0
@@ -699,12 +1005,9 @@ class SmartDiffStrategy(ImportStrategy):
         total_full_replace = 0
 
         # Process documents in batches
-        offset = 0
-        while True:
-            documents = self.get_documents(collection, config, offset)
-
-            if not documents:
-                break
+        for documents in self.iter_export_batches(collection, config):
+            # created_at/updated_at of every row inserted for this batch
+            batch_ts = datetime.now()
 
             # Process each document individually for diff calculation
             for doc in documents:
@@ -740,7 +1043,7 @@ class SmartDiffStrategy(ImportStrategy):
                         postgres_repo, config.table_name, parent_id, to_delete
                     )
                     inserted = self._insert_specific_items(
-                        postgres_repo, config.table_name, parent_id, to_insert, config
+                        postgres_repo, config.table_name, parent_id, to_insert, batch_ts
                     )
                     total_records_deleted += deleted
                     total_records_inserted += inserted
@@ -751,12 +1054,15 @@ class SmartDiffStrategy(ImportStrategy):
                         postgres_repo, config.table_name, parent_id
                     )
                     inserted = self._insert_specific_items(
-                        postgres_repo, config.table_name, parent_id, current_items, config
+                        postgres_repo, config.table_name, parent_id, current_items, batch_ts
                     )
                     total_records_deleted += deleted
                     total_records_inserted += inserted
                     total_full_replace += 1
 
+                # Deletes are left open so each parent's delete + insert commit together
+                conn.commit()
+
             processed_docs += len(documents)
 
             if DIRECT_IMPORT:
@@ -764,11 +1070,6 @@ class SmartDiffStrategy(ImportStrategy):
                       f"(inserted: {total_records_inserted}, deleted: {total_records_deleted}, "
                       f"diff-based: {total_diff_based}, full-replace: {total_full_replace})")
 
-            offset += config.batch_size
-
-            if len(documents) < config.batch_size:
-                break
-
         print(f"Completed smart incremental sync for {config.table_name}: "
               f"{total_records_inserted} inserted, {total_records_deleted} deleted "
               f"(diff-based: {total_diff_based}, full-replace: {total_full_replace})")
@@ -812,6 +1113,7 @@ class SmartDiffStrategy(ImportStrategy):
                 parent_id=parent_id,
                 child_ids_to_delete=items_to_delete,
                 additional_conditions=additional_conditions,
+                commit=False,
             )
         except Exception as e:
             print(f"Error deleting specific items for {parent_id}: {e}")
@@ -825,13 +1127,14 @@ class SmartDiffStrategy(ImportStrategy):
                 table_name=table_name,
                 column_name=parent_column,
                 parent_ids=[parent_id],
+                commit=False,
             )
         except Exception as e:
             print(f"Error deleting all items for {parent_id}: {e}")
             return 0
 
-    def _insert_specific_items(self, postgres_repo, table_name, parent_id, items_to_insert, config) -> int:
-        """Insert specific relationships"""
+    def _insert_specific_items(self, postgres_repo, table_name, parent_id, items_to_insert, now: datetime) -> int:
+        """Insert specific relationships, stamped with the batch timestamp now"""
         if not items_to_insert:
             return 0
 
@@ -841,7 +1144,7 @@ class SmartDiffStrategy(ImportStrategy):
             columns = None
 
             for item in items_to_insert:
-                values, cols = self._item_to_sql_values(parent_id, item)
+                values, cols = self._item_to_sql_values(parent_id, item, now)
                 if columns is None:
                     columns = cols
                 batch_values.append(values)
@@ -860,27 +1163,28 @@ class SmartDiffStrategy(ImportStrategy):
             return 0
 
     @abstractmethod
-    def _item_to_sql_values(self, parent_id: str, item: tuple):
+    def _item_to_sql_values(self, parent_id: str, item: tuple, now: datetime):
         """
         Convert an item tuple to SQL values and columns.
 
         Args:
             parent_id: Parent entity ID
             item: Tuple from extract_current_items (e.g., ('child_id',) or ('child_id', 'type'))
+            now: Timestamp for created_at/updated_at, taken once per document batch
 
         Returns:
             (values, columns) tuple for SQL insertion
 
         Example for simple relationship:
             return (
-                [parent_id, item[0], datetime.now(), datetime.now()],
-                ['user_id', 'event_id', 'created_at', 'updated_at']
+                (parent_id, item[0], now, now),
+                ('user_id', 'event_id', 'created_at', 'updated_at')
             )
 
         Example for relationship with type:
             return (
-                [parent_id, item[0], item[1], datetime.now(), datetime.now()],
-                ['user_id', 'target_id', 'type', 'created_at', 'updated_at']
+                (parent_id, item[0], item[1], now, now),
+                ('user_id', 'target_id', 'type', 'created_at', 'updated_at')
             )
         """
         pass
@@ -320,10 +320,9 @@ def run_matomo_sync():
         # Close connections
         if maria_conn:
             maria_conn.close()
-        if pg_conn:
-            pg_conn.close()
 
         close_mariadb_connection()
+        # Also closes pg_conn
         close_postgres_connection()
 
 
@@ -1,4 +1,14 @@
 from datetime import datetime, time
+from itertools import islice
+
+from pymongo import ASCENDING
+
+# Incremental queries filter on either date; one index per $or branch. Results are sorted
+# on _id afterwards, which a range on the leading date key cannot serve from the index
+SYNC_INDEX_KEYS = (
+    [("creation_date", ASCENDING), ("_id", ASCENDING)],
+    [("update_date", ASCENDING), ("_id", ASCENDING)],
+)
 
 
 class MongoRepository:
@@ -20,11 +30,43 @@ class MongoRepository:
         }
 
     @staticmethod
-    def count_documents(collection, after_date=None, extra_filter=None):
+    def combine_filters(*filters):
+        """AND filters together without one overwriting another's condition on the same key.
+
+        Disjoint filters merge into one document; a filter repeating a key already used
+        (an _id range on an _id filter, a date $or on an array $or) is kept apart under $and.
+        """
         query = {}
-        if extra_filter:
-            query.update(extra_filter)
-        query.update(MongoRepository.build_date_filter(after_date))
+        clauses = []
+        for mongo_filter in filters:
+            if not mongo_filter:
+                continue
+            if query.keys() & mongo_filter.keys():
+                clauses.append(dict(mongo_filter))
+            else:
+                query.update(mongo_filter)
+        return {"$and": [query, *clauses]} if clauses else query
+
+    @staticmethod
+    def build_query(after_date=None, extra_filter=None):
+        return MongoRepository.combine_filters(extra_filter, MongoRepository.build_date_filter(after_date))
+
+    @staticmethod
+    def build_keyset_filter(after_id):
+        """Resume after the last _id of the previous page (keyset pagination)"""
+        return {"_id": {"$gt": after_id}} if after_id is not None else {}
+
+    @staticmethod
+    def ensure_sync_indexes(collection):
+        """Create the indexes behind build_date_filter(); a no-op when they already exist"""
+        return [collection.create_index(keys) for keys in SYNC_INDEX_KEYS]
+
+    @staticmethod
+    def count_documents(collection, after_date=None, extra_filter=None):
+        query = MongoRepository.build_query(after_date, extra_filter)
+        if not query:
+            # Unfiltered: read the count from collection metadata instead of scanning
+            return collection.estimated_document_count()
         return collection.count_documents(query)
 
     @staticmethod
@@ -33,13 +75,33 @@ class MongoRepository:
         after_date=None,
         extra_filter=None,
         projection=None,
-        sort_field="creation_date",
-        offset=0,
+        after_id=None,
         limit=5000,
     ):
-        query = {}
-        if extra_filter:
-            query.update(extra_filter)
-        query.update(MongoRepository.build_date_filter(after_date))
-        cursor = collection.find(query, projection).sort(sort_field, 1).skip(offset).limit(limit)
+        query = MongoRepository.combine_filters(
+            MongoRepository.build_query(after_date, extra_filter),
+            MongoRepository.build_keyset_filter(after_id),
+        )
+        cursor = collection.find(query, projection).sort("_id", 1).limit(limit)
         return list(cursor)
+
+    @staticmethod
+    def iter_document_batches(
+        collection,
+        after_date=None,
+        extra_filter=None,
+        projection=None,
+        batch_size=5000,
+    ):
+        """Yield lists of up to batch_size documents read from a single cursor.
+
+        Unlike paging with skip(), the server never re-scans documents already returned,
+        so the cost of each batch does not grow with its position in the collection.
+        """
+        query = MongoRepository.build_query(after_date, extra_filter)
+        cursor = collection.find(query, projection).sort("_id", 1).batch_size(batch_size)
+        try:
+            while batch := list(islice(cursor, batch_size)):
+                yield batch
+        finally:
+            cursor.close()
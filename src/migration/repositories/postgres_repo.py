@@ -1,16 +1,44 @@
 from datetime import datetime
+from functools import lru_cache
+import hashlib
 import os
 import psycopg2
+from psycopg2.extras import execute_values
 
 from src.migration.import_summary import ImportSummary
 
 
+@lru_cache(maxsize=256)
+def build_prepared_insert(table_name, columns, conflict_clause=""):
+    """Return (name, PREPARE statement, EXECUTE template) for a table/column tuple.
+
+    The name is derived from the INSERT text, so every repository sharing a connection
+    agrees on it and the server parses and plans each insert shape once per session.
+    """
+    positional = ", ".join(f"${index}" for index in range(1, len(columns) + 1))
+    insert_sql = (
+        f"INSERT INTO {table_name} ({', '.join(columns)}) "
+        f"VALUES ({positional}){conflict_clause}"
+    )
+    name = "insert_" + hashlib.sha1(insert_sql.encode()).hexdigest()[:16]
+    placeholders = ", ".join(["%s"] * len(columns))
+    return name, f"PREPARE {name} AS {insert_sql}", f"EXECUTE {name} ({placeholders})"
+
+
+@lru_cache(maxsize=256)
+def build_values_insert(table_name, columns, conflict_clause=""):
+    """Return the multi-row INSERT template filled by execute_values() for a table/column tuple"""
+    return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES %s{conflict_clause}"
+
+
 class PostgresRepository:
     def __init__(self, conn, summary_instance=None, import_by_batch=True, direct_import=True):
         self.conn = conn
         self.summary = summary_instance or ImportSummary()
         self.import_by_batch = import_by_batch
         self.direct_import = direct_import
+        # Prepared statement names known to exist on this connection
+        self._prepared = set()
 
     def execute_batch(
         self,
@@ -52,29 +80,30 @@ class PostgresRepository:
         if not batch_values:
             return 0
 
-        placeholders = ", ".join(["%s"] * len(columns))
         conflict_clause = (
             on_conflict_clause
             if on_conflict_clause is not None
             else (" ON CONFLICT (id) DO NOTHING" if use_on_conflict else "")
         )
-        sql_template = (
-            f"INSERT INTO {table_name} ({', '.join(columns)}) "
-            f"VALUES ({placeholders}){conflict_clause}"
-        )
-
         cursor = self.conn.cursor()
         try:
+            columns = tuple(columns)
             if self.import_by_batch:
                 cursor.execute("SAVEPOINT batch_insert")
                 try:
-                    cursor.executemany(sql_template, batch_values)
+                    # One multi-row INSERT per batch; a single page keeps rowcount for the whole batch
+                    execute_values(
+                        cursor,
+                        build_values_insert(table_name, columns, conflict_clause),
+                        batch_values,
+                        page_size=len(batch_values),
+                    )
                     actual_insertions = cursor.rowcount
 
                     if not use_on_conflict and actual_insertions != len(batch_values):
                         cursor.execute("ROLLBACK TO SAVEPOINT batch_insert")
                         return self._handle_batch_errors(
-                            cursor, sql_template, batch_values, table_name
+                            cursor, table_name, columns, conflict_clause, batch_values
                         )
 
                     cursor.execute("RELEASE SAVEPOINT batch_insert")
@@ -85,12 +114,15 @@ class PostgresRepository:
 
                     self.conn.commit()
                     return actual_insertions
-                except psycopg2.IntegrityError:
+                except (psycopg2.IntegrityError, psycopg2.errors.CardinalityViolation):
+                    # CardinalityViolation: the batch upserts the same id twice, which one
+                    # statement cannot do; row-by-row retries apply them in order instead
                     cursor.execute("ROLLBACK TO SAVEPOINT batch_insert")
                     return self._handle_batch_errors(
-                        cursor, sql_template, batch_values, table_name
+                        cursor, table_name, columns, conflict_clause, batch_values
                     )
             else:
+                sql_template = self._prepare_insert(cursor, table_name, columns, conflict_clause)
                 successful_count = 0
                 for values in batch_values:
                     cursor.execute("SAVEPOINT individual_insert")
@@ -112,9 +144,21 @@ class PostgresRepository:
         finally:
             cursor.close()
 
-    def _handle_batch_errors(self, cursor, sql, batch_values, table_name):
+    def _prepare_insert(self, cursor, table_name, columns, conflict_clause):
+        """PREPARE the INSERT for this shape if the session lacks it; return its EXECUTE template"""
+        name, prepare_sql, execute_sql = build_prepared_insert(table_name, columns, conflict_clause)
+        if name not in self._prepared:
+            # Prepared statements outlive transactions and repositories, so ask the session
+            cursor.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (name,))
+            if cursor.fetchone() is None:
+                cursor.execute(prepare_sql)
+            self._prepared.add(name)
+        return execute_sql
+
+    def _handle_batch_errors(self, cursor, table_name, columns, conflict_clause, batch_values):
         cursor.close()
         cursor = self.conn.cursor()
+        sql = self._prepare_insert(cursor, table_name, columns, conflict_clause)
         successful_count = 0
 
         for values in batch_values:
@@ -245,17 +289,55 @@ class PostgresRepository:
         print(f"Generated SQL for {len(batch_values)} records in {sql_file_path}")
         return len(batch_values)
 
-    def delete_by_parent_ids(self, table_name, column_name, parent_ids):
+    def delete_by_parent_ids(self, table_name, column_name, parent_ids, commit=True):
+        """Delete every row whose column_name is in parent_ids.
+
+        With commit=False the DELETE stays in the open transaction so the caller can commit
+        it together with the INSERT that replaces those rows.
+        """
         if not parent_ids:
             return 0
 
         cursor = self.conn.cursor()
         try:
-            placeholders = ", ".join(["%s"] * len(parent_ids))
-            delete_sql = f"DELETE FROM {table_name} WHERE {column_name} IN ({placeholders})"
-            cursor.execute(delete_sql, parent_ids)
+            # One array parameter keeps the statement text identical whatever the batch size
+            delete_sql = f"DELETE FROM {table_name} WHERE {column_name} = ANY(%s)"
+            cursor.execute(delete_sql, (list(parent_ids),))
             deleted_count = cursor.rowcount
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
+            return deleted_count
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def delete_stale_relationships(self, table_name, parent_column, parent_ids, key_columns, kept_keys,
+                                   commit=True):
+        """Delete the rows of parent_ids whose key_columns values are not in kept_keys.
+
+        Rows still present in kept_keys are left untouched, so re-syncing an unchanged
+        relationship costs no write. With commit=False the DELETE stays in the open
+        transaction, like delete_by_parent_ids().
+        """
+        if not parent_ids:
+            return 0
+
+        kept_columns = [list(values) for values in zip(*kept_keys)] or [[] for _ in key_columns]
+        unnest_args = ", ".join(["%s::text[]"] * len(key_columns))
+        match = " AND ".join(f"kept.{column} = {table_name}.{column}" for column in key_columns)
+        delete_sql = (
+            f"DELETE FROM {table_name} WHERE {parent_column} = ANY(%s) AND NOT EXISTS ("
+            f"SELECT 1 FROM unnest({unnest_args}) AS kept({', '.join(key_columns)}) WHERE {match})"
+        )
+
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(delete_sql, (list(parent_ids), *kept_columns))
+            deleted_count = cursor.rowcount
+            if commit:
+                self.conn.commit()
             return deleted_count
         except Exception:
             self.conn.rollback()
@@ -296,7 +378,7 @@ class PostgresRepository:
         finally:
             cursor.close()
 
-    def delete_specific_relationships(self, table_name, parent_column, child_column, parent_id, child_ids_to_delete, additional_conditions=None):
+    def delete_specific_relationships(self, table_name, parent_column, child_column, parent_id, child_ids_to_delete, additional_conditions=None, commit=True):
         """
         Delete specific relationships (not all relationships for a parent).
 
@@ -307,6 +389,7 @@ class PostgresRepository:
             parent_id: Parent entity ID
             child_ids_to_delete: Set of tuples representing relationships to delete
             additional_conditions: Dict of column:value pairs for additional WHERE conditions (e.g., {'type': 'basic'})
+            commit: Commit immediately (default) or leave the DELETE in the open transaction
 
         Returns:
             Number of rows deleted
@@ -342,13 +425,13 @@ class PostgresRepository:
             else:
                 # Simple case: just child_id
                 child_ids_list = [item[0] if isinstance(item, tuple) else item for item in child_ids_to_delete]
-                placeholders = ", ".join(["%s"] * len(child_ids_list))
-                delete_sql = f"DELETE FROM {table_name} WHERE {parent_column} = %s AND {child_column} IN ({placeholders})"
-                params = [parent_id] + child_ids_list
+                delete_sql = f"DELETE FROM {table_name} WHERE {parent_column} = %s AND {child_column} = ANY(%s)"
+                params = (parent_id, child_ids_list)
 
             cursor.execute(delete_sql, params)
             deleted_count = cursor.rowcount
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
             return deleted_count
         except Exception:
             self.conn.rollback()
@@ -1,8 +1,13 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 from src.connections.mongo_connection import get_mongo_collection, MongoConnection
-from src.connections.postgres_connection import connect_postgres, setup_tables, close_postgres_connection, parse_global_date_threshold, parse_batch_size
-from src.schemas.schemas import TABLE_SCHEMAS
-from src.migration.data_export import export_table_data, get_last_insert_date, print_import_summary
+from src.connections.postgres_connection import connect_postgres, setup_tables, close_postgres_connection, parse_global_date_threshold, parse_batch_size, parse_migration_workers, parse_create_source_indexes
+from src.schemas.schemas import TABLE_SCHEMAS, MIGRATION_TIERS
+from src.migration.data_export import export_table_data, get_last_insert_date, delete_sync_checkpoints, print_import_summary
 from src.migration.import_summary import ImportSummary
+from src.migration.repositories.mongo_repo import MongoRepository
+from pymongo.errors import PyMongoError
 from datetime import datetime
 from typing import Optional
 
@@ -40,104 +45,163 @@ def apply_global_threshold(table_date: Optional[datetime],
     return effective_date
 
 
+def ensure_source_indexes():
+    """Index every source collection on its sync dates (opt-in through CREATE_SOURCE_INDEXES).
+
+    Each branch of the Step 2 date $or can then select its documents through an index
+    instead of scanning the collection. Batches are still sorted on _id, which these
+    indexes cannot provide, so the matched documents are sorted in memory: this pays
+    off when an incremental run selects a small share of the collection.
+    """
+    for collection_name in sorted({schema.mongo_collection for schema in TABLE_SCHEMAS.values()}):
+        try:
+            MongoRepository.ensure_sync_indexes(get_mongo_collection(collection_name))
+        except PyMongoError as e:
+            # A read-only source still migrates, just with collection scans
+            print(f"⚠️  Could not index {collection_name} on creation_date/update_date: {e}")
+
+
+def migrate_table(conn, table_name, schema, global_threshold, batch_size):
+    """Run steps 1-4 for a single table on the given PostgreSQL connection."""
+    print(f"\n{'='*80}")
+    print(f"Processing table: {table_name}")
+    print(f"{'='*80}")
+
+    collection = get_mongo_collection(schema.mongo_collection)
+    entity_summary = ImportSummary()
+
+    # Check for forced reimport
+    if schema.force_reimport:
+        print("🔄 FORCE REIMPORT enabled for this table")
+        if schema.truncate_before_import:
+            print("⚠️  TRUNCATE enabled - clearing all existing data")
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"TRUNCATE TABLE {table_name} CASCADE")
+                # Emptied tables must not resume from their old checkpoints
+                delete_sync_checkpoints(conn, table_name, commit=False)
+                conn.commit()
+                print(f"   → Table {table_name} truncated successfully")
+            except Exception as e:
+                print(f"   ⚠️ Error truncating table: {e}")
+                conn.rollback()
+            finally:
+                cursor.close()
+        after_date = None
+        print("   → Global date threshold bypassed")
+        print("   → Will perform full reimport from MongoDB")
+    else:
+        # STEP 1: Get Last Migration Date from PostgreSQL
+        table_last_date = get_last_insert_date(conn, table_name)
+
+        # Determine effective threshold (table-specific takes priority over global)
+        effective_threshold = schema.date_threshold if schema.date_threshold else global_threshold
+
+        # Apply threshold logic (use earlier date)
+        after_date = apply_global_threshold(table_last_date, effective_threshold)
+
+        # Enhanced logging
+        if schema.date_threshold:
+            print(f"📅 Table date threshold active: {schema.date_threshold.strftime('%Y-%m-%d')}")
+
+        if after_date:
+            print(f"📅 Step 1: Last migration date: {after_date.strftime('%Y-%m-%d %H:%M:%S')}")
+            if schema.date_threshold and after_date == schema.date_threshold:
+                print(f"   → Using table-specific threshold (earlier than table date)")
+            elif global_threshold and after_date == global_threshold:
+                print(f"   → Using global threshold (earlier than table date)")
+            else:
+                print("   → Will import records created or updated after this date")
+        else:
+            print("📅 Step 1: No existing records found")
+            if schema.date_threshold:
+                print(f"   → Will use table threshold: {schema.date_threshold.strftime('%Y-%m-%d')}")
+            elif global_threshold:
+                print(f"   → Will use global threshold: {global_threshold.strftime('%Y-%m-%d')}")
+            else:
+                print("   → Will perform full import")
+
+    # STEP 2-4: Strategy handles fetching, transforming, and importing
+    export_table_data(
+        conn,
+        table_name=table_name,
+        collection=collection,
+        summary_instance=entity_summary,
+        after_date=after_date,
+        batch_size=batch_size,
+    )
+
+    print_import_summary(table_name, entity_summary)
+
+
+def _migrate_table_in_worker(table_name, global_threshold, batch_size):
+    """Process-pool entry point: each worker owns its PostgreSQL and MongoDB connections.
+
+    Connections are opened and closed per table, so every parallel table pays one
+    PostgreSQL and one MongoDB handshake, plus an SSH tunnel each in remote mode.
+    That cost is small next to migrating a table, and closing everything here means
+    no socket or tunnel is left open when the pool shuts its workers down.
+    """
+    conn = connect_postgres(synchronous_commit=False)
+    try:
+        migrate_table(conn, table_name, TABLE_SCHEMAS[table_name], global_threshold, batch_size)
+    finally:
+        MongoConnection().close()
+        # Closes conn, then its SSH tunnel
+        close_postgres_connection()
+    return table_name
+
+
+def migrate_tier_in_parallel(table_names, workers, global_threshold, batch_size):
+    """Migrate the tables of one tier in worker processes and wait for all of them."""
+    # 'spawn' so workers never inherit the parent's PostgreSQL socket or MongoClient
+    with ProcessPoolExecutor(max_workers=min(workers, len(table_names)),
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [
+            executor.submit(_migrate_table_in_worker, table_name, global_threshold, batch_size)
+            for table_name in table_names
+        ]
+        for future in futures:
+            future.result()
+
+
 def run_migration():
     try:
-        conn = connect_postgres()
+        conn = connect_postgres(synchronous_commit=False)
         conn = setup_tables(conn)
 
         # Load global configuration once at migration start
         global_threshold = parse_global_date_threshold()
         batch_size = parse_batch_size()
+        workers = parse_migration_workers()
 
         print(f"\n⚙️  Batch size: {batch_size}")
+        if workers > 1:
+            print(f"⚙️  Migration workers: {workers}")
         if global_threshold:
             print(f"🌐 Global date threshold active: {global_threshold.strftime('%Y-%m-%d')}")
         print()
 
-        # Sort tables by export_order to respect foreign key dependencies
-        sorted_tables = sorted(TABLE_SCHEMAS.items(), key=lambda x: x[1].export_order)
-
-        for table_name, schema in sorted_tables:
-            print(f"\n{'='*80}")
-            print(f"Processing table: {table_name}")
-            print(f"{'='*80}")
-
-            collection = get_mongo_collection(schema.mongo_collection)
-            entity_summary = ImportSummary()
-
-            # Check for forced reimport
-            if schema.force_reimport:
-                print("🔄 FORCE REIMPORT enabled for this table")
-                if schema.truncate_before_import:
-                    print("⚠️  TRUNCATE enabled - clearing all existing data")
-                    cursor = conn.cursor()
-                    try:
-                        cursor.execute(f"TRUNCATE TABLE {table_name} CASCADE")
-                        conn.commit()
-                        print(f"   → Table {table_name} truncated successfully")
-                    except Exception as e:
-                        print(f"   ⚠️ Error truncating table: {e}")
-                        conn.rollback()
-                    finally:
-                        cursor.close()
-                after_date = None
-                print("   → Global date threshold bypassed")
-                print("   → Will perform full reimport from MongoDB")
+        if parse_create_source_indexes():
+            ensure_source_indexes()
+
+        # Tiers follow export_order and foreign keys;
+        # tables inside a tier are independent of each other
+        for table_names in MIGRATION_TIERS:
+            if workers > 1 and len(table_names) > 1:
+                migrate_tier_in_parallel(table_names, workers, global_threshold, batch_size)
             else:
-                # STEP 1: Get Last Migration Date from PostgreSQL
-                table_last_date = get_last_insert_date(conn, table_name)
-
-                # Determine effective threshold (table-specific takes priority over global)
-                effective_threshold = schema.date_threshold if schema.date_threshold else global_threshold
-
-                # Apply threshold logic (use earlier date)
-                after_date = apply_global_threshold(table_last_date, effective_threshold)
-
-                # Enhanced logging
-                if schema.date_threshold:
-                    print(f"📅 Table date threshold active: {schema.date_threshold.strftime('%Y-%m-%d')}")
-
-                if after_date:
-                    print(f"📅 Step 1: Last migration date: {after_date.strftime('%Y-%m-%d %H:%M:%S')}")
-                    if schema.date_threshold and after_date == schema.date_threshold:
-                        print(f"   → Using table-specific threshold (earlier than table date)")
-                    elif global_threshold and after_date == global_threshold:
-                        print(f"   → Using global threshold (earlier than table date)")
-                    else:
-                        print("   → Will import records created or updated after this date")
-                else:
-                    print("📅 Step 1: No existing records found")
-                    if schema.date_threshold:
-                        print(f"   → Will use table threshold: {schema.date_threshold.strftime('%Y-%m-%d')}")
-                    elif global_threshold:
-                        print(f"   → Will use global threshold: {global_threshold.strftime('%Y-%m-%d')}")
-                    else:
-                        print("   → Will perform full import")
-
-            # STEP 2-4: Strategy handles fetching, transforming, and importing
-            export_table_data(
-                conn,
-                table_name=table_name,
-                collection=collection,
-                summary_instance=entity_summary,
-                after_date=after_date,
-                batch_size=batch_size,
-            )
-
-            print_import_summary(table_name, entity_summary)
+                for table_name in table_names:
+                    migrate_table(conn, table_name, TABLE_SCHEMAS[table_name], global_threshold, batch_size)
 
         print("\n" + "=" * 80)
         print("✅ All data migration completed successfully!")
         print("=" * 80)
 
     finally:
-        # Close connections and SSH tunnels
-        if 'conn' in locals():
-            conn.close()
-
         # Close MongoDB connection and SSH tunnel
         mongo_conn = MongoConnection()
         mongo_conn.close()
 
-        # Close PostgreSQL SSH tunnel
+        # Close the PostgreSQL connection and its SSH tunnel
         close_postgres_connection()
@@ -1,6 +1,14 @@
 from src.migration.import_strategies import DeleteAndInsertStrategy, SmartDiffStrategy, ImportConfig
 from src.migration.repositories.mongo_repo import MongoRepository
 from datetime import datetime
+from types import MappingProxyType
+
+# Read-only projections built once at import and reused by every find()
+_DAY_CONTENTS_PROJECTION = MappingProxyType({'_id': 1, 'contents': 1, 'creation_date': 1, 'update_date': 1})
+_DAY_LOGBOOKS_PROJECTION = MappingProxyType({'_id': 1, 'main_logbooks': 1, 'creation_date': 1, 'update_date': 1})
+_COACHING_REASONS_PROJECTION = MappingProxyType({'_id': 1, 'reasons': 1, 'health_reason': 1, 'creation_date': 1, 'update_date': 1})
+# (source array, type column value) for coaching_reasons rows
+_REASON_ARRAY_TYPES = (('reasons', 'reason'), ('health_reason', 'health_reason'))
 
 
 def create_days_contents_links_strategy():
@@ -10,18 +18,12 @@ def create_days_contents_links_strategy():
         def count_total_documents(self, collection, config: ImportConfig) -> int:
             """Count days that have contents array"""
             mongo_filter = {'contents': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get day documents with contents array"""
+        def get_document_query(self, config: ImportConfig):
+            """Day documents with contents array"""
             mongo_filter = {'contents': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'contents': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _DAY_CONTENTS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Extract all content links from a day document"""
@@ -41,12 +43,12 @@ def create_days_contents_links_strategy():
                     # It's just an ObjectId
                     content_id = str(content_item)
 
-                batch_values.append([
+                batch_values.append((
                     day_id,
                     content_id,
                     creation_date,
                     update_date or creation_date
-                ])
+                ))
 
             return batch_values, ['day_id', 'content_id', 'created_at', 'updated_at']
 
@@ -77,18 +79,12 @@ def create_days_logbooks_links_strategy():
         def count_total_documents(self, collection, config: ImportConfig) -> int:
             """Count days that have main_logbooks array"""
             mongo_filter = {'main_logbooks': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get day documents with main_logbooks array"""
+        def get_document_query(self, config: ImportConfig):
+            """Day documents with main_logbooks array"""
             mongo_filter = {'main_logbooks': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'main_logbooks': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _DAY_LOGBOOKS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Extract all logbook links from a day document"""
@@ -108,12 +104,12 @@ def create_days_logbooks_links_strategy():
                     # It's just an ObjectId
                     logbook_id = str(logbook_item)
 
-                batch_values.append([
+                batch_values.append((
                     day_id,
                     logbook_id,
                     creation_date,
                     update_date or creation_date
-                ])
+                ))
 
             return batch_values, ['day_id', 'logbook_id', 'created_at', 'updated_at']
 
@@ -147,21 +143,15 @@ def create_coaching_reasons_strategy():
                 {'reasons': {'$exists': True, '$ne': []}},
                 {'health_reason': {'$exists': True, '$ne': []}}
             ]}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get coaching documents with reasons or health_reason arrays"""
+        def get_document_query(self, config: ImportConfig):
+            """Coaching documents with reasons or health_reason arrays"""
             mongo_filter = {'$or': [
                 {'reasons': {'$exists': True, '$ne': []}},
                 {'health_reason': {'$exists': True, '$ne': []}}
             ]}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'reasons': 1, 'health_reason': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _COACHING_REASONS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Extract all reason relationships from a coaching document"""
@@ -169,27 +159,12 @@ def create_coaching_reasons_strategy():
             creation_date = document.get('creation_date')
             update_date = document.get('update_date')
 
-            batch_values = []
-
-            # Extract reasons (type: 'reason')
-            for target_id in document.get('reasons', []):
-                batch_values.append([
-                    coaching_id,
-                    str(target_id),
-                    'reason',
-                    creation_date,
-                    update_date
-                ])
-
-            # Extract health_reason (type: 'health_reason')
-            for target_id in document.get('health_reason', []):
-                batch_values.append([
-                    coaching_id,
-                    str(target_id),
-                    'health_reason',
-                    creation_date,
-                    update_date
-                ])
+            # Reasons and health reasons share one table, typed by their source array
+            batch_values = [
+                (coaching_id, str(target_id), reason_type, creation_date, update_date)
+                for array_field, reason_type in _REASON_ARRAY_TYPES
+                for target_id in document.get(array_field, [])
+            ]
 
             return batch_values, ['coaching_id', 'target_id', 'type', 'created_at', 'updated_at']
 
@@ -231,21 +206,15 @@ def create_coaching_reasons_smart_strategy():
                 {'reasons': {'$exists': True, '$ne': []}},
                 {'health_reason': {'$exists': True, '$ne': []}}
             ]}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get coaching documents with reasons or health_reason arrays"""
+        def get_document_query(self, config: ImportConfig):
+            """Coaching documents with reasons or health_reason arrays"""
             mongo_filter = {'$or': [
                 {'reasons': {'$exists': True, '$ne': []}},
                 {'health_reason': {'$exists': True, '$ne': []}}
             ]}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'reasons': 1, 'health_reason': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _COACHING_REASONS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Not used in SmartDiffStrategy (uses extract_current_items instead)"""
@@ -285,13 +254,12 @@ def create_coaching_reasons_smart_strategy():
 
             return items
 
-        def _item_to_sql_values(self, parent_id: str, item: tuple):
+        def _item_to_sql_values(self, parent_id: str, item: tuple, now: datetime):
             """Convert item tuple to SQL values (includes type)"""
             target_id, reason_type = item
-            now = datetime.now()
             return (
-                [parent_id, target_id, reason_type, now, now],
-                ['coaching_id', 'target_id', 'type', 'created_at', 'updated_at']
+                (parent_id, target_id, reason_type, now, now),
+                ('coaching_id', 'target_id', 'type', 'created_at', 'updated_at')
             )
 
         def get_progress_message(self, processed: int, total: int, table_name: str, **kwargs) -> str:
@@ -1,5 +1,8 @@
 from src.migration.import_strategies import DeleteAndInsertStrategy, ImportConfig
 from src.migration.repositories.mongo_repo import MongoRepository
+from types import MappingProxyType
+
+_CONTENT_VIEWERS_PROJECTION = MappingProxyType({'_id': 1, 'viewed_by': 1, 'creation_date': 1, 'update_date': 1})
 
 
 def create_users_contents_reads_strategy():
@@ -9,18 +12,12 @@ def create_users_contents_reads_strategy():
         def count_total_documents(self, collection, config: ImportConfig) -> int:
             """Count contents that have viewed_by array"""
             mongo_filter = {'viewed_by': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get content documents with viewed_by array"""
+        def get_document_query(self, config: ImportConfig):
+            """Content documents with viewed_by array"""
             mongo_filter = {'viewed_by': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'viewed_by': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _CONTENT_VIEWERS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Extract all viewed_by relationships from a content document"""
@@ -40,12 +37,12 @@ def create_users_contents_reads_strategy():
                     # It's just an ObjectId
                     user_id = str(user_item)
 
-                batch_values.append([
+                batch_values.append((
                     content_id,
                     user_id,
                     creation_date,
                     update_date or creation_date
-                ])
+                ))
 
             return batch_values, ['content_id', 'user_id', 'created_at', 'updated_at']
 
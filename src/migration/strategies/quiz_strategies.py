@@ -1,6 +1,11 @@
-from src.migration.import_strategies import DeleteAndInsertStrategy, ImportConfig
+from types import MappingProxyType
+
+from src.migration.import_strategies import DeleteAndInsertStrategy, ImportConfig, array_item_id
 from src.migration.repositories.mongo_repo import MongoRepository
 
+# Both quiz strategies read the same fields
+_QUESTIONS_PROJECTION = MappingProxyType({'_id': 1, 'questions': 1, 'creation_date': 1, 'update_date': 1})
+
 
 def create_users_quizzs_links_questions_strategy():
     """Create strategy for users_quizzs_links_questions array extraction with delete-and-insert pattern"""
@@ -9,18 +14,12 @@ def create_users_quizzs_links_questions_strategy():
         def count_total_documents(self, collection, config: ImportConfig) -> int:
             """Count user quizzes that have questions array"""
             mongo_filter = {'questions': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get user quiz documents with questions array"""
+        def get_document_query(self, config: ImportConfig):
+            """User quiz documents with questions array"""
             mongo_filter = {'questions': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'questions': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _QUESTIONS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Extract all question relationships from a user quiz document"""
@@ -28,26 +27,15 @@ def create_users_quizzs_links_questions_strategy():
             creation_date = document.get('creation_date')
             update_date = document.get('update_date')
 
-            batch_values = []
-
-            # Extract questions
-            for question_item in document.get('questions', []):
-                # Handle both ObjectId and embedded document formats
-                if hasattr(question_item, 'get'):
-                    # It's a document with potential fields
-                    user_quizz_question_id = str(question_item.get('question', question_item.get('_id', question_item)))
-                else:
-                    # It's just an ObjectId
-                    user_quizz_question_id = str(question_item)
+            updated_at = update_date or creation_date
 
-                batch_values.append([
-                    user_quizz_id,
-                    user_quizz_question_id,
-                    creation_date,
-                    update_date or creation_date
-                ])
+            # Extract questions (bare ObjectIds or embedded documents, decided per item)
+            batch_values = [
+                (user_quizz_id, array_item_id(question_item, 'question'), creation_date, updated_at)
+                for question_item in document.get('questions', [])
+            ]
 
-            return batch_values, ['user_quizz_id', 'user_quizz_question_id', 'created_at', 'updated_at']
+            return batch_values, ('user_quizz_id', 'user_quizz_question_id', 'created_at', 'updated_at')
 
         def get_parent_id_from_document(self, document) -> str:
             """Extract user_quizz_id from user quiz document"""
@@ -76,18 +64,12 @@ def create_quizzs_links_questions_strategy():
         def count_total_documents(self, collection, config: ImportConfig) -> int:
             """Count quizzes that have questions array"""
             mongo_filter = {'questions': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get quiz documents with questions array"""
+        def get_document_query(self, config: ImportConfig):
+            """Quiz documents with questions array"""
             mongo_filter = {'questions': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'questions': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _QUESTIONS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Extract all question relationships from a quiz document"""
@@ -95,26 +77,15 @@ def create_quizzs_links_questions_strategy():
             creation_date = document.get('creation_date')
             update_date = document.get('update_date')
 
-            batch_values = []
-
-            # Extract questions
-            for question_item in document.get('questions', []):
-                # Handle both ObjectId and embedded document formats
-                if hasattr(question_item, 'get'):
-                    # It's a document with potential fields
-                    question_id = str(question_item.get('question', question_item.get('_id', question_item)))
-                else:
-                    # It's just an ObjectId
-                    question_id = str(question_item)
-
-                batch_values.append([
-                    quizz_id,
-                    question_id,
-                    creation_date,
-                    update_date or creation_date
-                ])
-
-            return batch_values, ['quizz_id', 'question_id', 'created_at', 'updated_at']
+            updated_at = update_date or creation_date
+
+            # Extract questions (bare ObjectIds or embedded documents, decided per item)
+            batch_values = [
+                (quizz_id, array_item_id(question_item, 'question'), creation_date, updated_at)
+                for question_item in document.get('questions', [])
+            ]
+
+            return batch_values, ('quizz_id', 'question_id', 'created_at', 'updated_at')
 
         def get_parent_id_from_document(self, document) -> str:
             """Extract quizz_id from quiz document"""
@@ -1,6 +1,14 @@
-from src.migration.import_strategies import DeleteAndInsertStrategy, SmartDiffStrategy, DirectTranslationStrategy, ImportConfig
+from src.migration.import_strategies import DeleteAndInsertStrategy, SmartDiffStrategy, ImportConfig, array_item_id
 from src.migration.repositories.mongo_repo import MongoRepository
+from bson import ObjectId
 from datetime import datetime
+from types import MappingProxyType
+
+# Legacy and smart strategies share these read-only projections
+_REGISTERED_EVENTS_PROJECTION = MappingProxyType({'_id': 1, 'registered_events': 1, 'creation_date': 1, 'update_date': 1})
+_USER_TARGETS_PROJECTION = MappingProxyType({'_id': 1, 'targets': 1, 'specificity_targets': 1, 'health_targets': 1, 'creation_date': 1, 'update_date': 1})
+# (source array, type column value) for users_targets rows
+_TARGET_ARRAY_TYPES = (('targets', 'basic'), ('specificity_targets', 'specificity'), ('health_targets', 'health'))
 
 
 def create_user_events_strategy():
@@ -10,45 +18,36 @@ def create_user_events_strategy():
         def count_total_documents(self, collection, config: ImportConfig) -> int:
             """Count users that have registered_events array"""
             mongo_filter = {'registered_events': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get user documents with registered_events array"""
+        def get_document_query(self, config: ImportConfig):
+            """User documents with registered_events array"""
             mongo_filter = {'registered_events': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'registered_events': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _REGISTERED_EVENTS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Extract all registered events from a user document"""
             user_id = str(document['_id'])
             creation_date = document.get('creation_date')
             update_date = document.get('update_date')
-
-            batch_values = []
-
-            # Extract registered events
-            for event_item in document.get('registered_events', []):
-                # Handle both ObjectId and embedded document formats
-                if hasattr(event_item, 'get'):
-                    # It's a document with potential fields
-                    event_id = str(event_item.get('event', event_item.get('_id', event_item)))
-                    event_date = event_item.get('date', creation_date)
-                else:
-                    # It's just an ObjectId
-                    event_id = str(event_item)
-                    event_date = creation_date
-
-                batch_values.append([
-                    user_id,
-                    event_id,
-                    event_date or creation_date,
-                    update_date or event_date or creation_date
-                ])
+            events = document.get('registered_events', [])
+
+            if all(type(event_item) is ObjectId for event_item in events):
+                # Common shape: bare ObjectIds, which carry no date of their own
+                updated_at = update_date or creation_date
+                batch_values = [(user_id, str(event_id), creation_date, updated_at) for event_id in events]
+            else:
+                batch_values = []
+                for event_item in events:
+                    # Arrays may mix bare ObjectIds and embedded documents; only the latter carry a date
+                    event_date = event_item.get('date', creation_date) if hasattr(event_item, 'get') else creation_date
+
+                    batch_values.append((
+                        user_id,
+                        array_item_id(event_item, 'event'),
+                        event_date or creation_date,
+                        update_date or event_date or creation_date
+                    ))
 
             return batch_values, ['user_id', 'event_id', 'created_at', 'updated_at']
 
@@ -83,22 +82,16 @@ def create_users_targets_strategy():
                 {'specificity_targets': {'$exists': True, '$ne': []}},
                 {'health_targets': {'$exists': True, '$ne': []}}
             ]}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get user documents with target arrays"""
+        def get_document_query(self, config: ImportConfig):
+            """User documents with target arrays"""
             mongo_filter = {'$or': [
                 {'targets': {'$exists': True, '$ne': []}},
                 {'specificity_targets': {'$exists': True, '$ne': []}},
                 {'health_targets': {'$exists': True, '$ne': []}}
             ]}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'targets': 1, 'specificity_targets': 1, 'health_targets': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _USER_TARGETS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Extract all target relationships from a user document"""
@@ -106,37 +99,12 @@ def create_users_targets_strategy():
             creation_date = document.get('creation_date')
             update_date = document.get('update_date')
 
-            batch_values = []
-
-            # Extract basic targets
-            for target_id in document.get('targets', []):
-                batch_values.append([
-                    user_id,
-                    str(target_id),
-                    'basic',
-                    creation_date,
-                    update_date
-                ])
-
-            # Extract specificity targets
-            for target_id in document.get('specificity_targets', []):
-                batch_values.append([
-                    user_id,
-                    str(target_id),
-                    'specificity',
-                    creation_date,
-                    update_date
-                ])
-
-            # Extract health targets
-            for target_id in document.get('health_targets', []):
-                batch_values.append([
-                    user_id,
-                    str(target_id),
-                    'health',
-                    creation_date,
-                    update_date
-                ])
+            # One row per target, typed by the array it comes from
+            batch_values = [
+                (user_id, str(target_id), target_type, creation_date, update_date)
+                for array_field, target_type in _TARGET_ARRAY_TYPES
+                for target_id in document.get(array_field, [])
+            ]
 
             return batch_values, ['user_id', 'target_id', 'type', 'created_at', 'updated_at']
 
@@ -174,18 +142,12 @@ def create_user_events_smart_strategy():
         def count_total_documents(self, collection, config: ImportConfig) -> int:
             """Count users that have registered_events array"""
             mongo_filter = {'registered_events': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get user documents with registered_events array"""
+        def get_document_query(self, config: ImportConfig):
+            """User documents with registered_events array"""
             mongo_filter = {'registered_events': {'$exists': True, '$ne': []}}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'registered_events': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _REGISTERED_EVENTS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Not used in SmartDiffStrategy (uses extract_current_items instead)"""
@@ -207,21 +169,15 @@ def create_user_events_smart_strategy():
             """Extract current event IDs from MongoDB document as a set"""
             items = set()
             for event_item in document.get('registered_events', []):
-                # Handle both ObjectId and embedded document formats
-                if hasattr(event_item, 'get'):
-                    event_id = str(event_item.get('event', event_item.get('_id', event_item)))
-                else:
-                    event_id = str(event_item)
-                items.add((event_id,))  # Return as tuple for consistency
+                items.add((array_item_id(event_item, 'event'),))  # Return as tuple for consistency
             return items
 
-        def _item_to_sql_values(self, parent_id: str, item: tuple):
+        def _item_to_sql_values(self, parent_id: str, item: tuple, now: datetime):
             """Convert item tuple to SQL values"""
             event_id = item[0]
-            now = datetime.now()
             return (
-                [parent_id, event_id, now, now],
-                ['user_id', 'event_id', 'created_at', 'updated_at']
+                (parent_id, event_id, now, now),
+                ('user_id', 'event_id', 'created_at', 'updated_at')
             )
 
         def get_progress_message(self, processed: int, total: int, table_name: str, **kwargs) -> str:
@@ -251,22 +207,16 @@ def create_users_targets_smart_strategy():
                 {'specificity_targets': {'$exists': True, '$ne': []}},
                 {'health_targets': {'$exists': True, '$ne': []}}
             ]}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-            return collection.count_documents(mongo_filter)
+            return collection.count_documents(MongoRepository.build_query(config.after_date, mongo_filter))
 
-        def get_documents(self, collection, config: ImportConfig, offset: int = 0):
-            """Get user documents with target arrays"""
+        def get_document_query(self, config: ImportConfig):
+            """User documents with target arrays"""
             mongo_filter = {'$or': [
                 {'targets': {'$exists': True, '$ne': []}},
                 {'specificity_targets': {'$exists': True, '$ne': []}},
                 {'health_targets': {'$exists': True, '$ne': []}}
             ]}
-            mongo_filter.update(MongoRepository.build_date_filter(config.after_date))
-
-            return list(collection.find(
-                mongo_filter,
-                {'_id': 1, 'targets': 1, 'specificity_targets': 1, 'health_targets': 1, 'creation_date': 1, 'update_date': 1}
-            ).sort('creation_date', 1).skip(offset).limit(config.batch_size))
+            return mongo_filter, _USER_TARGETS_PROJECTION
 
         def extract_data_for_sql(self, document, config: ImportConfig):
             """Not used in SmartDiffStrategy (uses extract_current_items instead)"""
@@ -310,13 +260,12 @@ def create_users_targets_smart_strategy():
 
             return items
 
-        def _item_to_sql_values(self, parent_id: str, item: tuple):
+        def _item_to_sql_values(self, parent_id: str, item: tuple, now: datetime):
             """Convert item tuple to SQL values (includes type)"""
             target_id, target_type = item
-            now = datetime.now()
             return (
-                [parent_id, target_id, target_type, now, now],
-                ['user_id', 'target_id', 'type', 'created_at', 'updated_at']
+                (parent_id, target_id, target_type, now, now),
+                ('user_id', 'target_id', 'type', 'created_at', 'updated_at')
             )
 
         def get_progress_message(self, processed: int, total: int, table_name: str, **kwargs) -> str:
@@ -0,0 +1,3 @@
+from .table_schemas import get_create_all_sql
+
+__all__ = ["get_create_all_sql"]
@@ -1,10 +1,16 @@
+import importlib
 import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional
 
 import yaml
 
-from .table_schemas import ColumnDefinition, BaseEntitySchema, TableSchema
+from .table_schemas import BaseEntitySchema, TableSchema, column_definition
 
 
 def _parse_date_threshold(date_str: Optional[str], table_name: str) -> Optional[datetime]:
@@ -24,124 +30,193 @@ def _parse_date_threshold(date_str: Optional[str], table_name: str) -> Optional[
     except ValueError:
         print(f"⚠️  Invalid date_threshold format for {table_name}: '{date_str}' (expected YYYY-MM-DD)")
         return None
-from src.migration.strategies.user_strategies import (
-    create_user_events_strategy,
-    create_users_targets_strategy,
-    create_user_events_smart_strategy,
-    create_users_targets_smart_strategy,
-)
-from src.migration.strategies.quiz_strategies import (
-    create_quizzs_links_questions_strategy,
-    create_users_quizzs_links_questions_strategy,
-)
-from src.migration.strategies.content_strategies import (
-    create_users_contents_reads_strategy,
-)
-from src.migration.strategies.coaching_strategies import (
-    create_days_contents_links_strategy,
-    create_days_logbooks_links_strategy,
-    create_coaching_reasons_strategy,
-    create_coaching_reasons_smart_strategy,
-)
 
 DEFAULT_SCHEMA_PATH = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "..", "config", "schemas.yaml")
 )
+# libyaml's C loader parses the same safe subset much faster; PyYAML wheels usually bundle it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_USER_STRATEGIES = "src.migration.strategies.user_strategies"
+_QUIZ_STRATEGIES = "src.migration.strategies.quiz_strategies"
+_CONTENT_STRATEGIES = "src.migration.strategies.content_strategies"
+_COACHING_STRATEGIES = "src.migration.strategies.coaching_strategies"
 
-# Strategy Factories: Maps strategy names to factory functions
+# Strategy Factories: Maps strategy names to (module, factory function) pairs.
+# Tables keep only the strategy name; get_import_strategy() imports the module the first
+# time that table is migrated, so loading schemas for DDL alone imports no strategy module.
 # Use "smart" versions for optimal performance (50-100x faster for typical incremental changes)
 STRATEGY_FACTORIES = {
     # Smart strategies (recommended) - use diff-based optimization
-    "user_events": create_user_events_smart_strategy,
-    "users_targets": create_users_targets_smart_strategy,
-    "coaching_reasons": create_coaching_reasons_smart_strategy,
+    "user_events": (_USER_STRATEGIES, "create_user_events_smart_strategy"),
+    "users_targets": (_USER_STRATEGIES, "create_users_targets_smart_strategy"),
+    "coaching_reasons": (_COACHING_STRATEGIES, "create_coaching_reasons_smart_strategy"),
 
     # Legacy strategies (fallback) - full delete-and-insert pattern
-    "user_events_legacy": create_user_events_strategy,
-    "users_targets_legacy": create_users_targets_strategy,
-    "coaching_reasons_legacy": create_coaching_reasons_strategy,
+    "user_events_legacy": (_USER_STRATEGIES, "create_user_events_strategy"),
+    "users_targets_legacy": (_USER_STRATEGIES, "create_users_targets_strategy"),
+    "coaching_reasons_legacy": (_COACHING_STRATEGIES, "create_coaching_reasons_strategy"),
 
     # Other relationship strategies (TODO: migrate to SmartDiffStrategy)
-    "quizzs_links_questions": create_quizzs_links_questions_strategy,
-    "users_quizzs_links_questions": create_users_quizzs_links_questions_strategy,
-    "users_contents_reads": create_users_contents_reads_strategy,
-    "days_contents_links": create_days_contents_links_strategy,
-    "days_logbooks_links": create_days_logbooks_links_strategy,
+    "quizzs_links_questions": (_QUIZ_STRATEGIES, "create_quizzs_links_questions_strategy"),
+    "users_quizzs_links_questions": (_QUIZ_STRATEGIES, "create_users_quizzs_links_questions_strategy"),
+    "users_contents_reads": (_CONTENT_STRATEGIES, "create_users_contents_reads_strategy"),
+    "days_contents_links": (_COACHING_STRATEGIES, "create_days_contents_links_strategy"),
+    "days_logbooks_links": (_COACHING_STRATEGIES, "create_days_logbooks_links_strategy"),
 }
 
 
 def _build_column_definitions(columns_config):
-    return [ColumnDefinition(**column) for column in columns_config]
+    return [column_definition(**column_config) for column_config in columns_config]
 
 
-def _resolve_strategy(strategy_name: Optional[str]):
-    if not strategy_name:
-        return None
-    factory = STRATEGY_FACTORIES.get(strategy_name)
-    if not factory:
-        raise ValueError(f"Unknown import strategy: {strategy_name}")
-    return factory()
+def _check_strategy_name(strategy_name: Optional[str], table_name: str) -> Optional[str]:
+    if strategy_name and strategy_name not in STRATEGY_FACTORIES:
+        raise ValueError(f"Unknown import strategy for {table_name}: {strategy_name}")
+    return strategy_name
+
+
+@lru_cache(maxsize=None)
+def _strategy_factory(strategy_name: str):
+    module_name, function_name = STRATEGY_FACTORIES[strategy_name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+# One strategy instance per table, created on first use; the lock keeps
+# parallel tier workers from building two instances of the same table
+_STRATEGY_INSTANCES: Dict[str, Any] = {}
+_STRATEGY_INSTANCES_LOCK = threading.Lock()
+
+
+def get_import_strategy(schema: TableSchema):
+    """Return the import strategy of a table, or None for the default DirectTranslationStrategy.
+
+    schemas.yaml tables hold the strategy name; it is resolved and instantiated here.
+    """
+    strategy = schema.import_strategy
+    if not isinstance(strategy, str):
+        return strategy
+    with _STRATEGY_INSTANCES_LOCK:
+        if schema.name not in _STRATEGY_INSTANCES:
+            _STRATEGY_INSTANCES[schema.name] = _strategy_factory(strategy)()
+        return _STRATEGY_INSTANCES[schema.name]
 
 
 def _load_yaml_schema(path: str) -> Dict[str, Any]:
+    """Parse the schema YAML; load_schemas() memoizes the result per process."""
     with open(path, "r", encoding="utf-8") as handle:
-        data = yaml.safe_load(handle) or {}
-    if "tables" in data:
-        return data["tables"]
-    return data
+        data = yaml.load(handle, Loader=_YAML_LOADER) or {}
+    return data["tables"] if "tables" in data else data
+
+
+@dataclass(slots=True)
+class TableConfig:
+    """One table entry of schemas.yaml, with every optional key defaulted."""
+    include_base: bool = False
+    name: Optional[str] = None
+    mongo_collection: Optional[str] = None
+    export_order: int = 0
+    import_strategy: Optional[str] = None
+    force_reimport: bool = False
+    truncate_before_import: bool = False
+    date_threshold: Optional[str] = None
+    columns: List[Dict[str, Any]] = field(default_factory=list)
+    explicit_mappings: Optional[Dict[str, str]] = None
+    unique_constraints: Optional[List[List[str]]] = None
+    additional_columns: List[Dict[str, Any]] = field(default_factory=list)
+    additional_mappings: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_yaml(cls, key: str, config: Dict[str, Any]) -> 'TableConfig':
+        unknown = set(config) - {f.name for f in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown keys in schema for {key}: {', '.join(sorted(unknown))}")
+        return cls(**config)
+
+
+def _build_schema(key: str, config: TableConfig) -> TableSchema:
+    """Build one TableSchema from its YAML entry; name and collection default to the key."""
+    name = config.name or key
+    mongo_collection = config.mongo_collection or name
+    strategy = _check_strategy_name(config.import_strategy, key)
+    date_threshold = _parse_date_threshold(config.date_threshold, key)
+
+    if config.include_base:
+        return BaseEntitySchema.create_with_base(
+            additional_columns=_build_column_definitions(config.additional_columns),
+            name=name,
+            mongo_collection=mongo_collection,
+            additional_mappings=config.additional_mappings,
+            export_order=config.export_order,
+            import_strategy=strategy,
+            force_reimport=config.force_reimport,
+            truncate_before_import=config.truncate_before_import,
+            date_threshold=date_threshold,
+        )
+
+    return TableSchema.create(
+        columns=_build_column_definitions(config.columns),
+        name=name,
+        mongo_collection=mongo_collection,
+        explicit_mappings=config.explicit_mappings,
+        export_order=config.export_order,
+        import_strategy=strategy,
+        unique_constraints=config.unique_constraints,
+        force_reimport=config.force_reimport,
+        truncate_before_import=config.truncate_before_import,
+        date_threshold=date_threshold,
+    )
+
+
+@lru_cache(maxsize=None)
+def load_schemas(schema_path: str = DEFAULT_SCHEMA_PATH) -> Mapping[str, TableSchema]:
+    """Build the table schemas once per path; the cached mapping is shared, so it is read-only."""
+    tables_config = _load_yaml_schema(schema_path)
+    return MappingProxyType({
+        key: _build_schema(key, TableConfig.from_yaml(key, config))
+        for key, config in tables_config.items()
+    })
 
 
-def load_schemas(schema_path: str = DEFAULT_SCHEMA_PATH) -> Dict[str, TableSchema]:
-    tables_config = _load_yaml_schema(schema_path)
-    schemas: Dict[str, TableSchema] = {}
-
-    for key, config in tables_config.items():
-        include_base = config.get("include_base", False)
-        name = config.get("name")
-        mongo_collection = config.get("mongo_collection")
-        export_order = config.get("export_order", 0)
-        strategy = _resolve_strategy(config.get("import_strategy"))
-        force_reimport = config.get("force_reimport", False)
-        truncate_before_import = config.get("truncate_before_import", False)
-        date_threshold = _parse_date_threshold(config.get("date_threshold"), key)
-
-        if include_base:
-            additional_columns = _build_column_definitions(config.get("additional_columns", []))
-            additional_mappings = config.get("additional_mappings", {})
-            schema = BaseEntitySchema.create_with_base(
-                additional_columns=additional_columns,
-                name=name or key,
-                mongo_collection=mongo_collection,
-                additional_mappings=additional_mappings,
-                export_order=export_order,
-                import_strategy=strategy,
-                force_reimport=force_reimport,
-                truncate_before_import=truncate_before_import,
-                date_threshold=date_threshold,
-            )
-        else:
-            columns = _build_column_definitions(config.get("columns", []))
-            schema = TableSchema.create(
-                columns=columns,
-                name=name or key,
-                mongo_collection=mongo_collection,
-                explicit_mappings=config.get("explicit_mappings"),
-                export_order=export_order,
-                import_strategy=strategy,
-                unique_constraints=config.get("unique_constraints"),
-                force_reimport=force_reimport,
-                truncate_before_import=truncate_before_import,
-                date_threshold=date_threshold,
-            )
-
-        if schema.name is None:
-            schema.name = key
-        if schema.mongo_collection is None:
-            schema.mongo_collection = key
-
-        schemas[key] = schema
-
-    return schemas
+def _referenced_tables(schema: TableSchema) -> set:
+    """Table names this schema's foreign keys point to, e.g. 'users' for 'users(id)'."""
+    return {fk_ref.split("(", 1)[0].strip() for fk_ref in schema.fk_refs if fk_ref}
+
+
+def build_migration_tiers(schemas: Mapping[str, TableSchema]) -> List[List[str]]:
+    """Split tables into tiers that must run one after the other.
+
+    Tiers follow export_order, ascending. Inside one export_order, a table that
+    references another table of the same order goes to a later tier, so tables
+    sharing a tier have no foreign keys between them and can be migrated concurrently.
+    """
+    by_order: Dict[int, List[str]] = defaultdict(list)
+    for key, schema in schemas.items():
+        by_order[schema.export_order].append(key)
+
+    tiers: List[List[str]] = []
+    for order in sorted(by_order):
+        keys = by_order[order]
+        key_by_table = {schemas[key].name: key for key in keys}
+        pending = {
+            key: {key_by_table[table] for table in _referenced_tables(schemas[key])
+                  if table in key_by_table} - {key}
+            for key in keys
+        }
+        while pending:
+            ready = [key for key in keys if key in pending and not pending[key]]
+            if not ready:
+                raise ValueError(
+                    f"Foreign key cycle between tables of export_order {order}: "
+                    f"{', '.join(sorted(pending))}"
+                )
+            tiers.append(ready)
+            for key in ready:
+                del pending[key]
+            for dependencies in pending.values():
+                dependencies.difference_update(ready)
+    return tiers
 
 
 TABLE_SCHEMAS = load_schemas()
+MIGRATION_TIERS = build_migration_tiers(TABLE_SCHEMAS)
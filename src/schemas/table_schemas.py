@@ -1,8 +1,13 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from functools import lru_cache, partial
+from types import MappingProxyType
+from typing import Callable, Dict, FrozenSet, List, Mapping, Optional, Any, Tuple
 
-@dataclass
+from bson import ObjectId
+
+@dataclass(slots=True, frozen=True)
 class ColumnDefinition:
     name: str
     sql_type: str
@@ -10,19 +15,110 @@ class ColumnDefinition:
     primary_key: bool = False
     foreign_key: Optional[str] = None
 
-@dataclass
+    def __post_init__(self):
+        # Column names, SQL types and FK targets come from a tiny vocabulary ('created_at',
+        # 'VARCHAR', 'users(id)', ...) repeated across every table; share one string object per value
+        object.__setattr__(self, 'name', sys.intern(self.name))
+        object.__setattr__(self, 'sql_type', sys.intern(self.sql_type))
+        if self.foreign_key is not None:
+            object.__setattr__(self, 'foreign_key', sys.intern(self.foreign_key))
+
+
+# Column line suffix by flag: plain, primary key, NOT NULL
+_COLUMN_SUFFIXES = ("", " PRIMARY KEY", " NOT NULL")
+_CREATE_TABLE_TEMPLATE = "CREATE TABLE IF NOT EXISTS %s (%s);"
+
+
+@lru_cache(maxsize=None)
+def column_definition(name: str, sql_type: str, nullable: bool = True, primary_key: bool = False,
+                      foreign_key: Optional[str] = None) -> ColumnDefinition:
+    """Return a shared ColumnDefinition; identical declarations across tables reuse one instance."""
+    return ColumnDefinition(name, sql_type, nullable, primary_key, foreign_key)
+
+
+@lru_cache(maxsize=None)
+def _compile_resolver(mongo_fields: Tuple[str, ...]) -> Callable[[Any], Tuple[Any, ...]]:
+    """Generate a document -> row function with every field access unrolled.
+
+    Missing fields become None, ObjectIds become strings and '_id' is always
+    stringified. Schemas mapping the same Mongo fields share one function.
+    """
+    items = []
+    for mongo_field in mongo_fields:
+        if mongo_field == '_id':
+            items.append("str(document['_id'])")
+        else:
+            items.append(f"(str(v) if isinstance(v := get({mongo_field!r}), ObjectId) else v)")
+    source = (
+        "def resolve(document):\n"
+        "    get = document.get\n"
+        f"    return ({''.join(item + ', ' for item in items)})\n"
+    )
+    namespace = {'ObjectId': ObjectId}
+    exec(source, namespace)
+    return namespace['resolve']
+
+
+@dataclass(slots=True, frozen=True)
 class TableSchema:
     name: str
     mongo_collection: str
-    columns: List[ColumnDefinition]
-    field_mappings: Dict[str, str]
+    columns: Tuple[ColumnDefinition, ...]
+    field_mappings: Mapping[str, str]
     export_order: int = 0
     import_strategy: Optional[Any] = None
     unique_constraints: Optional[List[List[str]]] = None
     force_reimport: bool = False
     truncate_before_import: bool = False
     date_threshold: Optional[datetime] = None
-    
+    # Derived once from field_mappings so per-document extraction is a single generated call
+    mongo_keys: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    mapped_columns: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    # Server-side find() projection: mapped fields plus the _id and dates the export pages and checkpoints on
+    projection: Mapping[str, int] = field(init=False, repr=False, compare=False)
+    _resolver: Callable[[Any], Tuple[Any, ...]] = field(init=False, repr=False, compare=False)
+    # Column attributes as parallel tuples (structure of arrays) for DDL and introspection passes
+    col_names: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    column_name_set: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    col_types: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    pk_mask: Tuple[bool, ...] = field(init=False, repr=False, compare=False)
+    not_null_mask: Tuple[bool, ...] = field(init=False, repr=False, compare=False)
+    fk_refs: Tuple[Optional[str], ...] = field(init=False, repr=False, compare=False)
+    # "col = EXCLUDED.col" per column, joined by the ON CONFLICT builder
+    excluded_fragments: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    has_id_primary_key: bool = field(init=False, repr=False, compare=False)
+    _create_sql: str = field(init=False, repr=False, compare=False)
+    # ON CONFLICT clause per inserted column set (None = all columns), filled on first use
+    _conflict_clauses: Dict[Optional[FrozenSet[str]], str] = field(
+        default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Frozen: normalise inputs and derive the cached views through object.__setattr__
+        derive = partial(object.__setattr__, self)
+        derive('columns', tuple(self.columns))
+        derive('field_mappings', MappingProxyType(dict(self.field_mappings)))
+        derive('mongo_keys', tuple(self.field_mappings))
+        derive('mapped_columns', tuple(self.field_mappings.values()))
+        derive('projection', MappingProxyType(dict.fromkeys(
+            ('_id', *self.mongo_keys, 'creation_date', 'update_date'), 1)))
+        derive('_resolver', _compile_resolver(self.mongo_keys))
+        derive('col_names', tuple(col.name for col in self.columns))
+        derive('column_name_set', frozenset(self.col_names))
+        derive('col_types', tuple(col.sql_type for col in self.columns))
+        derive('pk_mask', tuple(col.primary_key for col in self.columns))
+        derive('not_null_mask', tuple(not col.nullable for col in self.columns))
+        derive('fk_refs', tuple(col.foreign_key for col in self.columns))
+        derive('excluded_fragments', tuple(sys.intern(f"{name} = EXCLUDED.{name}") for name in self.col_names))
+        derive('has_id_primary_key', any(name == 'id' and is_pk for name, is_pk in zip(self.col_names, self.pk_mask)))
+        derive('_create_sql', self._build_create_sql())
+
+    def resolve(self, document) -> Tuple[Any, ...]:
+        """Return the values of a MongoDB document as a row tuple in mapped_columns order.
+
+        Missing fields become None and ObjectIds are converted to strings.
+        """
+        return self._resolver(document)
+
     @classmethod
     def create(cls, columns: List[ColumnDefinition], name: Optional[str] = None,
                mongo_collection: Optional[str] = None, explicit_mappings: Optional[Dict[str, str]] = None,
@@ -34,58 +130,47 @@ class TableSchema:
 
         Args:
             columns: List of column definitions
-            name: Table name (will be set from schema key if not specified)
+            name: Table name (required; load_schemas passes the YAML key when none is configured)
             mongo_collection: MongoDB collection name (defaults to table name if not specified)
             explicit_mappings: Only specify mappings where column name differs from field name
             date_threshold: Optional per-table date threshold for filtering records
         """
-        # Note: name will be set from schema key in TABLE_SCHEMAS if not provided
-        # Use table name as MongoDB collection name if not specified
+        # Both identifiers are settled here so schemas never need patching after construction
+        if name is None:
+            raise ValueError("TableSchema.create() requires a table name")
         if mongo_collection is None:
             mongo_collection = name
-        # Start with auto-generated mappings, but exclude 'id' if it exists (handled by _id mapping)
-        # Also exclude columns that have explicit mappings to avoid duplicates
-        excluded_columns = {'id'}
-        if explicit_mappings:
-            excluded_columns.update(explicit_mappings.values())
-
-        field_mappings = {col.name: col.name for col in columns if col.name not in excluded_columns}
-
-        # Override with explicit mappings if provided
-        if explicit_mappings:
-            field_mappings.update(explicit_mappings)
+        # Auto-generated identity mappings, then explicit ones in the same dict display.
+        # 'id' is never auto-mapped (it is either mapped from _id explicitly or generated),
+        # and columns targeted by an explicit mapping are skipped to avoid duplicates
+        explicit_mappings = {sys.intern(k): sys.intern(v) for k, v in (explicit_mappings or {}).items()}
+        excluded_columns = {'id', *explicit_mappings.values()}
+        field_mappings = {
+            **{col.name: col.name for col in columns if col.name not in excluded_columns},
+            **explicit_mappings,
+        }
 
         return cls(name, mongo_collection, columns, field_mappings, export_order, import_strategy,
                    unique_constraints, force_reimport, truncate_before_import, date_threshold)
     
     def get_create_sql(self) -> str:
-        column_defs = []
-        foreign_keys = []
-        unique_constraints = []
-        
-        for col in self.columns:
-            col_def = f"{col.name} {col.sql_type}"
-            if col.primary_key:
-                col_def += " PRIMARY KEY"
-            elif not col.nullable:
-                col_def += " NOT NULL"
-            column_defs.append(col_def)
-            
-            if col.foreign_key:
-                foreign_keys.append(f"FOREIGN KEY ({col.name}) REFERENCES {col.foreign_key}")
-        
-        if self.unique_constraints:
-            for constraint in self.unique_constraints:
-                constraint_cols = ', '.join(constraint)
-                unique_constraints.append(f"UNIQUE ({constraint_cols})")
-        
-        all_defs = column_defs + foreign_keys + unique_constraints
-        return f"""
-        CREATE TABLE IF NOT EXISTS {self.name} (
-            {',\n            '.join(all_defs)}
-        );
-        """
-    
+        return self._create_sql
+
+    def _build_create_sql(self) -> str:
+        column_defs = [
+            "%s %s%s" % (name, sql_type, _COLUMN_SUFFIXES[1 if pk else 2 if not_null else 0])
+            for name, sql_type, pk, not_null in zip(self.col_names, self.col_types,
+                                                    self.pk_mask, self.not_null_mask)
+        ]
+        foreign_keys = [
+            "FOREIGN KEY (%s) REFERENCES %s" % (name, fk_ref)
+            for name, fk_ref in zip(self.col_names, self.fk_refs) if fk_ref
+        ]
+        unique_constraints = [
+            "UNIQUE (%s)" % ', '.join(constraint) for constraint in self.unique_constraints or ()
+        ]
+        return _CREATE_TABLE_TEMPLATE % (self.name, ", ".join(column_defs + foreign_keys + unique_constraints))
+
     def get_on_conflict_clause(self, columns: list = None) -> str:
         """Get the appropriate ON CONFLICT clause for this table
 
@@ -93,49 +178,55 @@ class TableSchema:
             columns: Optional list of columns being inserted. If provided, only these columns
                     will be included in the UPDATE clause. If None, all schema columns are used.
         """
-        # Determine which columns to use for UPDATE clause
-        if columns:
-            # Use only the columns being inserted
-            insert_columns = set(columns)
-        else:
-            # Use all schema columns
-            insert_columns = {col.name for col in self.columns}
+        # Called once per insert batch with the same few column sets; build each clause once
+        key = frozenset(columns) if columns else None
+        clause = self._conflict_clauses.get(key)
+        if clause is None:
+            clause = self._conflict_clauses[key] = self._build_on_conflict_clause(key or self.column_name_set)
+        return clause
 
+    def _build_on_conflict_clause(self, insert_columns: FrozenSet[str]) -> str:
         # Check if table has an id column (primary key)
-        id_column = next((col for col in self.columns if col.name == 'id' and col.primary_key), None)
-        if id_column:
-            # Build UPDATE SET clause for all columns except id and primary keys
-            update_columns = []
-            for col in self.columns:
-                if not col.primary_key and col.name in insert_columns:
-                    update_columns.append(f"{col.name} = EXCLUDED.{col.name}")
-
-            if update_columns:
-                update_clause = ', '.join(update_columns)
-                return f" ON CONFLICT (id) DO UPDATE SET {update_clause}"
-            else:
-                return " ON CONFLICT (id) DO NOTHING"
-
-        # Check if table has unique constraints
-        if self.unique_constraints:
-            # Use the first unique constraint
-            constraint_cols = ', '.join(self.unique_constraints[0])
-
-            # Build UPDATE SET clause for all columns except those in unique constraint
-            update_columns = []
-            constraint_set = set(self.unique_constraints[0])
-            for col in self.columns:
-                if col.name not in constraint_set and not col.primary_key and col.name in insert_columns:
-                    update_columns.append(f"{col.name} = EXCLUDED.{col.name}")
-
-            if update_columns:
-                update_clause = ', '.join(update_columns)
-                return f" ON CONFLICT ({constraint_cols}) DO UPDATE SET {update_clause}"
-            else:
-                return f" ON CONFLICT ({constraint_cols}) DO NOTHING"
-
-        # No appropriate conflict resolution found
-        return ""
+        if self.has_id_primary_key:
+            conflict_target = 'id'
+            excluded_columns = frozenset()
+        # Otherwise use the first unique constraint
+        elif self.unique_constraints:
+            conflict_target = ', '.join(self.unique_constraints[0])
+            excluded_columns = frozenset(self.unique_constraints[0])
+        else:
+            # No appropriate conflict resolution found
+            return ""
+
+        # Build UPDATE SET clause for the inserted columns, skipping primary keys and the conflict target
+        update_clause = ', '.join(
+            fragment
+            for name, is_pk, fragment in zip(self.col_names, self.pk_mask, self.excluded_fragments)
+            if not is_pk and name in insert_columns and name not in excluded_columns
+        )
+        if not update_clause:
+            return f" ON CONFLICT ({conflict_target}) DO NOTHING"
+        # Skip rewriting rows whose source timestamp did not move (no WAL, no index churn);
+        # force_reimport tables and rows without a timestamp are always rewritten
+        if 'updated_at' in insert_columns and not self.force_reimport:
+            update_clause += (
+                f" WHERE {self.name}.updated_at IS DISTINCT FROM EXCLUDED.updated_at"
+                f" OR EXCLUDED.updated_at IS NULL"
+            )
+        return f" ON CONFLICT ({conflict_target}) DO UPDATE SET {update_clause}"
+
+
+# Shared read-only view; get_base_mappings() hands out copies so callers can extend them
+BASE_MAPPINGS = MappingProxyType({
+    '_id': 'id',
+    'creation_date': 'created_at',
+    'update_date': 'updated_at'
+})
+BASE_COLUMNS = (
+    column_definition('id', 'VARCHAR', primary_key=True),
+    column_definition('created_at', 'TIMESTAMP', nullable=False),
+    column_definition('updated_at', 'TIMESTAMP', nullable=False),
+)
 
 
 class BaseEntitySchema:
@@ -144,20 +235,12 @@ class BaseEntitySchema:
     @classmethod
     def get_base_columns(cls) -> List[ColumnDefinition]:
         """Returns the standard columns that all entities should have"""
-        return [
-            ColumnDefinition('id', 'VARCHAR', primary_key=True),
-            ColumnDefinition('created_at', 'TIMESTAMP', nullable=False),
-            ColumnDefinition('updated_at', 'TIMESTAMP', nullable=False)
-        ]
+        return list(BASE_COLUMNS)
     
     @classmethod
     def get_base_mappings(cls) -> Dict[str, str]:
         """Returns the standard field mappings that all entities should have"""
-        return {
-            '_id': 'id',
-            'creation_date': 'created_at',
-            'update_date': 'updated_at'
-        }
+        return dict(BASE_MAPPINGS)
     
     @classmethod
     def create_with_base(cls, additional_columns: List[ColumnDefinition] = None,
@@ -170,22 +253,16 @@ class BaseEntitySchema:
 
         Args:
             additional_columns: Additional columns beyond the base ones
-            name: Table name (will be set from schema key if not specified)
+            name: Table name (required, see TableSchema.create)
             mongo_collection: MongoDB collection name (defaults to table name if not specified)
             additional_mappings: Additional mappings beyond the base ones
             export_order: Export order for the table
-            import_strategy: Import strategy for the table
+            import_strategy: Import strategy for the table, or the name of a registered one
             date_threshold: Optional per-table date threshold for filtering records
         """
-        # Combine base columns with additional columns
-        columns = cls.get_base_columns()
-        if additional_columns:
-            columns.extend(additional_columns)
-
-        # Combine base mappings with additional mappings
-        explicit_mappings = cls.get_base_mappings()
-        if additional_mappings:
-            explicit_mappings.update(additional_mappings)
+        # Combine the shared base columns and mappings with the additional ones
+        columns = [*BASE_COLUMNS, *(additional_columns or ())]
+        explicit_mappings = {**BASE_MAPPINGS, **(additional_mappings or {})}
 
         return TableSchema.create(
             columns=columns,
@@ -199,3 +276,7 @@ class BaseEntitySchema:
             date_threshold=date_threshold
         )
 
+
+def get_create_all_sql(schemas: Dict[str, TableSchema]) -> str:
+    """Concatenate CREATE TABLE statements in export_order so FK targets are created first."""
+    return "\n".join(schema.get_create_sql() for schema in sorted(schemas.values(), key=lambda s: s.export_order))
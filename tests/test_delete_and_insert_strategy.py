@@ -10,7 +10,8 @@ from bson import ObjectId
 from datetime import datetime
 
 # Import the strategies
-from src.migration.import_strategies import DeleteAndInsertStrategy, ImportConfig, ImportUtils
+from src.migration.import_strategies import DeleteAndInsertStrategy, ImportConfig
+from src.migration.repositories.postgres_repo import PostgresRepository
 
 
 class MockDeleteAndInsertStrategy(DeleteAndInsertStrategy):
@@ -24,9 +25,9 @@ class MockDeleteAndInsertStrategy(DeleteAndInsertStrategy):
         """Mock implementation returning fixed count"""
         return 3
 
-    def get_documents(self, collection, config: ImportConfig, offset: int = 0):
+    def get_documents(self, collection, config: ImportConfig, after_id=None):
         """Mock implementation returning test documents"""
-        if offset == 0:
+        if after_id is None:
             # First batch
             return [
                 {'_id': ObjectId(), 'name': 'doc1', 'items': ['a', 'b']},
@@ -63,6 +64,13 @@ class MockDeleteAndInsertStrategy(DeleteAndInsertStrategy):
         return 'parent_id'
 
 
+class MockMergingStrategy(MockDeleteAndInsertStrategy):
+    """Mock strategy whose relationships are identified by (parent_id, item)"""
+
+    def get_conflict_keys(self, config: ImportConfig):
+        return ['parent_id', 'item']
+
+
 class TestDeleteAndInsertStrategy:
     """Test suite for DeleteAndInsertStrategy base class"""
 
@@ -98,7 +106,7 @@ class TestDeleteAndInsertStrategy:
 
     def test_template_method_flow(self, strategy, mock_conn, mock_collection, import_config):
         """Test that the template method calls all required methods in correct order"""
-        with patch.object(ImportUtils, 'execute_batch', return_value=3) as mock_execute:
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=3) as mock_execute:
             result = strategy.export_data(mock_conn, mock_collection, import_config)
 
             # Verify documents were processed
@@ -114,7 +122,7 @@ class TestDeleteAndInsertStrategy:
 
     def test_delete_existing_relationships(self, strategy, mock_conn, mock_collection, import_config):
         """Test that DELETE query is executed correctly for changed parents"""
-        with patch.object(ImportUtils, 'execute_batch', return_value=3):
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=3):
             strategy.export_data(mock_conn, mock_collection, import_config)
 
             # Verify cursor was created and DELETE was executed
@@ -123,10 +131,9 @@ class TestDeleteAndInsertStrategy:
 
             # Check that execute was called with DELETE statement
             assert cursor.execute.called
-            delete_call = cursor.execute.call_args_list[0]
-            sql = delete_call[0][0]
+            sql = cursor.execute.call_args_list[0].args[0]
             assert 'DELETE FROM test_relationships' in sql
-            assert 'WHERE parent_id IN' in sql
+            assert 'WHERE parent_id = ANY(%s)' in sql
 
             # Verify commit was called
             mock_conn.commit.assert_called()
@@ -136,17 +143,16 @@ class TestDeleteAndInsertStrategy:
 
     def test_insert_fresh_relationships(self, strategy, mock_conn, mock_collection, import_config):
         """Test that INSERT is executed with correct data"""
-        with patch.object(ImportUtils, 'execute_batch', return_value=3) as mock_execute:
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=3) as mock_execute:
             strategy.export_data(mock_conn, mock_collection, import_config)
 
             # Verify execute_batch was called
             assert mock_execute.called
 
             # Check parameters passed to execute_batch
-            call_args = mock_execute.call_args
-            batch_values = call_args[0][1]
-            columns = call_args[0][2]
-            table_name = call_args[0][3]
+            # autospec records self first: (repository, batch_values, columns, table_name)
+            _, batch_values, columns, table_name = mock_execute.call_args.args
+            options = mock_execute.call_args.kwargs
 
             # Verify table name
             assert table_name == 'test_relationships'
@@ -158,17 +164,15 @@ class TestDeleteAndInsertStrategy:
             assert len(batch_values) == 3  # doc1 has 2 items, doc2 has 1 item
 
             # Verify use_on_conflict is False (delete-and-insert pattern)
-            assert call_args[1]['use_on_conflict'] is False
-            assert call_args[1]['on_conflict_clause'] == ""
+            assert options['use_on_conflict'] is False
+            assert options['on_conflict_clause'] == ""
 
     def test_batch_processing_pagination(self, strategy, mock_conn, mock_collection, import_config):
         """Test that batching and pagination work correctly"""
-        with patch.object(ImportUtils, 'execute_batch', return_value=3):
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=3):
             strategy.export_data(mock_conn, mock_collection, import_config)
 
-            # Verify get_documents was called with correct offsets
-            # First call with offset=0 returns 2 documents
-            # Second call with offset=5000 returns empty list (stops)
+            # First call (no after_id) returns 2 documents, a short page, so paging stops
             assert len(strategy.documents_processed) == 2
 
     def test_error_handling_during_delete(self, strategy, mock_conn, mock_collection, import_config):
@@ -177,7 +181,7 @@ class TestDeleteAndInsertStrategy:
         cursor = mock_conn.cursor.return_value
         cursor.execute.side_effect = Exception("Database error")
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=3):
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=3):
             # Should not raise, but handle error gracefully
             result = strategy.export_data(mock_conn, mock_collection, import_config)
 
@@ -194,9 +198,9 @@ class TestDeleteAndInsertStrategy:
     def test_empty_document_batch(self, strategy, mock_conn, mock_collection, import_config):
         """Test handling when no documents are returned"""
         # Override get_documents to return empty list
-        strategy.get_documents = lambda coll, conf, offset: []
+        strategy.get_documents = lambda coll, conf, after_id: []
 
-        with patch.object(ImportUtils, 'execute_batch') as mock_execute:
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True) as mock_execute:
             result = strategy.export_data(mock_conn, mock_collection, import_config)
 
             # execute_batch should not be called if no documents
@@ -219,7 +223,7 @@ class TestDeleteAndInsertStrategy:
         # Override get_documents to return multiple batches
         call_count = [0]
 
-        def get_docs_multi_batch(coll, conf, offset):
+        def get_docs_multi_batch(coll, conf, after_id):
             call_count[0] += 1
             if call_count[0] == 1:
                 return [{'_id': ObjectId(), 'items': ['a']}, {'_id': ObjectId(), 'items': ['b']}]
@@ -229,8 +233,10 @@ class TestDeleteAndInsertStrategy:
                 return []
 
         strategy.get_documents = get_docs_multi_batch
+        # A full first batch is what makes the strategy ask for the next one
+        import_config.batch_size = 2
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=2) as mock_execute:
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=2) as mock_execute:
             result = strategy.export_data(mock_conn, mock_collection, import_config)
 
             # execute_batch should be called twice (once per batch)
@@ -254,8 +260,8 @@ class TestDeleteAndInsertIntegration:
             def count_total_documents(self, collection, config):
                 return 2
 
-            def get_documents(self, collection, config, offset=0):
-                if offset == 0:
+            def get_documents(self, collection, config, after_id=None):
+                if after_id is None:
                     return [
                         {
                             '_id': user1_id,
@@ -291,14 +297,14 @@ class TestDeleteAndInsertIntegration:
         mock_collection = Mock()
         config = ImportConfig('user_events', 'users', summary_instance=Mock())
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=3):
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=3):
             result = strategy.export_data(mock_conn, mock_collection, config)
 
             # Verify DELETE was called for user_events table
             cursor = mock_conn.cursor.return_value
-            delete_sql = cursor.execute.call_args_list[0][0][0]
+            delete_sql = cursor.execute.call_args_list[0].args[0]
             assert 'DELETE FROM user_events' in delete_sql
-            assert 'user_id IN' in delete_sql
+            assert 'user_id = ANY(%s)' in delete_sql
 
     def test_users_targets_scenario(self):
         """Test a realistic users_targets migration scenario with type discrimination"""
@@ -308,8 +314,8 @@ class TestDeleteAndInsertIntegration:
             def count_total_documents(self, collection, config):
                 return 1
 
-            def get_documents(self, collection, config, offset=0):
-                if offset == 0:
+            def get_documents(self, collection, config, after_id=None):
+                if after_id is None:
                     return [{
                         '_id': user_id,
                         'targets': [ObjectId(), ObjectId()],
@@ -347,11 +353,11 @@ class TestDeleteAndInsertIntegration:
         mock_collection = Mock()
         config = ImportConfig('users_targets', 'users', summary_instance=Mock())
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=4) as mock_execute:
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=4) as mock_execute:
             result = strategy.export_data(mock_conn, mock_collection, config)
 
             # Verify data was inserted with correct type discrimination
-            batch_values = mock_execute.call_args[0][1]
+            batch_values = mock_execute.call_args.args[1]
             assert len(batch_values) == 4  # 2 basic + 1 specificity + 1 health
 
             # Verify types are correct
@@ -361,5 +367,47 @@ class TestDeleteAndInsertIntegration:
             assert types.count('health') == 1
 
 
+class TestMergeOnConflictKeys:
+    """Test Step 4 when the relationship table has a unique key"""
+
+    @pytest.fixture
+    def mock_conn(self):
+        conn = Mock()
+        conn.cursor.return_value.rowcount = 1
+        return conn
+
+    @pytest.fixture
+    def import_config(self):
+        return ImportConfig(
+            table_name='test_relationships',
+            source_collection='test_collection',
+            summary_instance=Mock()
+        )
+
+    def test_only_stale_relationships_are_deleted(self, mock_conn, import_config):
+        """The DELETE keeps every (parent_id, item) pair present in the fresh rows"""
+        strategy = MockMergingStrategy()
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=3):
+            strategy.export_data(mock_conn, Mock(), import_config)
+
+        sql, params = mock_conn.cursor.return_value.execute.call_args_list[0].args
+        assert sql.startswith('DELETE FROM test_relationships WHERE parent_id = ANY(%s) AND NOT EXISTS')
+        assert 'AS kept(parent_id, item)' in sql
+        parent_ids, kept_parents, kept_items = params
+        assert parent_ids == strategy.parent_ids_extracted
+        assert sorted(kept_items) == ['a', 'b', 'c']
+        assert set(kept_parents) == set(parent_ids)
+
+    def test_fresh_relationships_are_upserted(self, mock_conn, import_config):
+        """Rows are merged on the conflict keys instead of being inserted blindly"""
+        strategy = MockMergingStrategy()
+        with patch.object(PostgresRepository, 'execute_batch', autospec=True, return_value=3) as mock_execute:
+            strategy.export_data(mock_conn, Mock(), import_config)
+
+        options = mock_execute.call_args.kwargs
+        assert options['use_on_conflict'] is True
+        assert options['on_conflict_clause'] == " ON CONFLICT (parent_id, item) DO NOTHING"
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -8,124 +8,348 @@ Tests end-to-end migration scenarios including:
 - Data consistency
 """
 
+import inspect
+import os
+import re
+import time
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from collections import namedtuple
+from dataclasses import replace
+from unittest.mock import Mock, patch
 from bson import ObjectId
 from datetime import datetime, timedelta
 
-from src.migration.data_export import get_last_insert_date, export_table_data
-from src.schemas.schemas import _create_user_events_strategy, _create_users_targets_strategy
-from src.migration.import_strategies import ImportConfig, ImportUtils, DirectTranslationStrategy
+from src.migration.data_export import get_last_insert_date
+from src.migration.strategies.user_strategies import (
+    create_user_events_strategy, create_users_targets_strategy, create_user_events_smart_strategy
+)
+from src.migration import import_strategies
+from src.migration.import_strategies import (
+    ImportConfig, prefetch_batches, DirectTranslationStrategy, ArrayExtractionConfig, ArrayExtractionStrategy
+)
+from src.migration.repositories.postgres_repo import PostgresRepository
+from src.schemas.schemas import TABLE_SCHEMAS
+
+
+MockStack = namedtuple('MockStack', ['conn', 'cursor', 'collection'])
+
+# No test asserts on document timestamps, so a fixed value keeps runs deterministic
+_FIXED_NOW = datetime(2024, 6, 1, 12, 0, 0)
+_TEMPLATE_DOC = {
+    '_id': ObjectId(),
+    'registered_events': [ObjectId()],
+    'creation_date': _FIXED_NOW,
+    'update_date': _FIXED_NOW
+}
+# Checkpoint lookup, only trusted while the table has rows
+_CHECKPOINT_SQL = (
+    "SELECT last_sync_at FROM migration_checkpoints "
+    "WHERE table_name = %s AND EXISTS (SELECT 1 FROM test_table)"
+)
+# Fallback without a checkpoint: GREATEST over both timestamp maxima, read from the requested table
+_LAST_INSERT_SQL = re.compile(r'GREATEST.*MAX\(created_at\).*MAX\(updated_at\).*test_table', re.DOTALL)
+_USER_ID_POOL = [ObjectId() for _ in range(100)]
+_EVENT_PAIR = [ObjectId(), ObjectId()]
+
+
+@pytest.fixture(scope="module")
+def user_events_strategy():
+    """Strategies keep no per-run state, so one instance serves the whole module"""
+    return create_user_events_strategy()
+
+
+@pytest.fixture(scope="module")
+def users_targets_strategy():
+    return create_users_targets_strategy()
+
+
+class NullSummary:
+    """ImportSummary stand-in that discards every record instead of recording Mock calls"""
+    __slots__ = ()
+
+    def record_success(self, entity, count=1):
+        pass
+
+    def record_error(self, entity, reason, failed_record=None):
+        pass
+
+    def record_skipped(self, entity, count=1):
+        pass
+
+
+_SUMMARY = NullSummary()
+# Tests derive their config with dataclasses.replace(), overriding only what differs
+_BASE_CONFIG = ImportConfig(table_name='user_events', source_collection='users', summary_instance=_SUMMARY)
+
+
+class FastCursor:
+    """Recording stand-in for a psycopg2 cursor"""
+    __slots__ = ('execute_calls', 'rowcount', 'fetchone_result', 'execute_error')
+
+    def __init__(self):
+        self.execute_calls = []
+        self.rowcount = 0
+        self.fetchone_result = None
+        self.execute_error = None
+
+    def execute(self, sql, params=None):
+        self.execute_calls.append((sql, params))
+        if self.execute_error is not None:
+            raise self.execute_error
+
+    def fetchone(self):
+        # A list holds one result per query, in execution order
+        if isinstance(self.fetchone_result, list):
+            return self.fetchone_result.pop(0)
+        return self.fetchone_result
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FastConn:
+    """Recording stand-in for a psycopg2 connection that always hands out the same cursor"""
+    __slots__ = ('_cursor', 'commit_count', 'rollback_called')
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commit_count = 0
+        self.rollback_called = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commit_count += 1
+
+    def rollback(self):
+        self.rollback_called = True
+
+
+@pytest.fixture
+def mock_stack():
+    """PostgreSQL connection wired to its cursor, plus an empty MongoDB collection"""
+    cursor = FastCursor()
+    return MockStack(FastConn(cursor), cursor, Mock())
+
+
+@pytest.fixture
+def batch_recorder(monkeypatch):
+    """Replace PostgresRepository.execute_batch with a stub recording (batch_values, options) per call"""
+    calls = []
+
+    def fake_execute_batch(self, batch_values, columns, table_name, **options):
+        calls.append((batch_values, options))
+        return len(batch_values)
+
+    monkeypatch.setattr(PostgresRepository, 'execute_batch', fake_execute_batch)
+    return calls
+
+
+class PaginatedCursorStub:
+    """MongoDB cursor stand-in holding one page of documents.
+
+    Like a pymongo cursor it is its own iterator, so repeated islice() reads
+    continue where the previous one stopped instead of restarting the page.
+    """
+    __slots__ = ('documents', '_it')
+
+    def __init__(self, documents):
+        self.documents = documents
+        self._it = iter(documents)
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def limit(self, count):
+        # pymongo returns the cursor itself; get_documents() drains it with list()
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._it)
+
+    def close(self):
+        pass
+
+
+def make_paginated_find(*pages):
+    """Return a collection.find replacement serving one page per call, then empty pages.
+
+    The returned cursor supports both the sort/limit chain used by get_documents()
+    and direct iteration used by streaming strategies.
+    """
+    calls = []
+
+    def find(*args, **kwargs):
+        documents = pages[len(calls)] if len(calls) < len(pages) else []
+        calls.append(args)
+        return PaginatedCursorStub(documents)
+
+    find.calls = calls
+    return find
 
 
 class TestIncrementalMigration:
     """Test incremental migration behavior"""
 
-    def test_get_last_insert_date_with_data(self):
-        """Test retrieving last migration date from non-empty table"""
-        mock_conn = Mock()
-        mock_cursor = Mock()
-        mock_conn.cursor.return_value = mock_cursor
+    def test_get_last_insert_date_from_checkpoint(self, mock_stack):
+        """The stored checkpoint is returned without scanning the table"""
+        mock_conn, mock_cursor, _ = mock_stack
+
+        last_date = datetime(2024, 1, 15, 10, 30, 0)
+        mock_cursor.fetchone_result = (last_date,)
+
+        result = get_last_insert_date(mock_conn, 'test_table')
+
+        assert result == last_date
+        assert mock_cursor.execute_calls == [(_CHECKPOINT_SQL, ('test_table',))]
 
-        # Simulate a table with data
+    def test_get_last_insert_date_with_data(self, mock_stack):
+        """Without a checkpoint the date falls back to the table's latest timestamps"""
+        mock_conn, mock_cursor, _ = mock_stack
+
+        # No checkpoint row, then a table with data
         last_date = datetime(2024, 1, 15, 10, 30, 0)
-        mock_cursor.fetchone.return_value = (last_date,)
+        mock_cursor.fetchone_result = [None, (last_date,)]
 
         result = get_last_insert_date(mock_conn, 'test_table')
 
         assert result == last_date
         # Verify correct SQL query was executed
-        assert mock_cursor.execute.called
-        sql = mock_cursor.execute.call_args[0][0]
-        assert 'GREATEST' in sql
-        assert 'MAX(created_at)' in sql
-        assert 'MAX(updated_at)' in sql
-        assert 'test_table' in sql
-
-    def test_get_last_insert_date_empty_table(self):
+        sql = mock_cursor.execute_calls[-1][0]
+        assert _LAST_INSERT_SQL.search(sql)
+
+    def test_get_last_insert_date_empty_table(self, mock_stack):
         """Test retrieving last migration date from empty table"""
-        mock_conn = Mock()
-        mock_cursor = Mock()
-        mock_conn.cursor.return_value = mock_cursor
+        mock_conn, mock_cursor, _ = mock_stack
 
-        # Simulate empty table (returns 1900-01-01)
-        mock_cursor.fetchone.return_value = (datetime(1900, 1, 1, 0, 0, 0),)
+        # Simulate no checkpoint and an empty table (returns 1900-01-01)
+        mock_cursor.fetchone_result = [None, (datetime(1900, 1, 1, 0, 0, 0),)]
 
         result = get_last_insert_date(mock_conn, 'test_table')
 
         # Should return None for empty tables
         assert result is None
 
-    def test_get_last_insert_date_null_result(self):
+    def test_export_saves_latest_document_date(self, mock_stack, batch_recorder):
+        """A finished export stores the latest creation/update date it wrote as the checkpoint"""
+        from src.migration.data_export import export_table_data
+
+        mock_conn, mock_cursor, mock_collection = mock_stack
+        newest = _FIXED_NOW + timedelta(days=1)
+        mock_collection.find = make_paginated_find([
+            {'_id': ObjectId(), 'name': 'Old', 'creation_date': _FIXED_NOW, 'update_date': _FIXED_NOW},
+            {'_id': ObjectId(), 'name': 'New', 'creation_date': _FIXED_NOW, 'update_date': newest},
+        ])
+        mock_collection.name = 'companies'
+
+        export_table_data(mock_conn, 'companies', mock_collection, summary_instance=_SUMMARY)
+
+        sql, params = mock_cursor.execute_calls[-1]
+        assert 'INSERT INTO migration_checkpoints' in sql
+        assert params == ('companies', newest)
+
+    def test_get_last_insert_date_null_result(self, mock_stack):
         """Test handling when query returns NULL"""
-        mock_conn = Mock()
-        mock_cursor = Mock()
-        mock_conn.cursor.return_value = mock_cursor
+        mock_conn, mock_cursor, _ = mock_stack
 
-        mock_cursor.fetchone.return_value = (None,)
+        mock_cursor.fetchone_result = (None,)
 
         result = get_last_insert_date(mock_conn, 'test_table')
 
         assert result is None
 
 
-class TestDeleteAndInsertCorrectness:
-    """Test that delete-and-insert pattern correctly handles additions and removals"""
+def _assert_event_removal(mock_conn, mock_cursor, batch_recorder, user_id, event_id):
+    # Verify DELETE was called
+    assert mock_cursor.execute_calls
+    delete_sql, params = mock_cursor.execute_calls[0]
+    assert 'DELETE FROM user_events' in delete_sql
+    # Only relationships missing from the fresh set are deleted
+    assert 'NOT EXISTS' in delete_sql
+    assert params == ([user_id], [user_id], [event_id])
 
-    def test_user_events_handles_event_removal(self):
-        """Test that removing events from MongoDB array deletes them from PostgreSQL"""
-        strategy = _create_user_events_strategy()
-        user_id = ObjectId()
-        event1 = ObjectId()
-        event2 = ObjectId()
+    # Verify INSERT was called with only the remaining relationship
+    batch_values = batch_recorder[-1][0]
+    assert len(batch_values) == 1
+    assert batch_values[0][1] == event_id
 
-        # Scenario: User originally had 2 events, now has only 1
-        # PostgreSQL should delete both old relationships and insert only the current one
 
-        mock_collection = Mock()
-        mock_cursor = Mock()
+def _assert_referential_integrity(mock_conn, mock_cursor, batch_recorder, user_id, event_id):
+    # Fresh relationships are merged on the table's unique key
+    batch_values, options = batch_recorder[-1]
+    assert options['use_on_conflict'] is True
+    assert options['on_conflict_clause'].startswith(" ON CONFLICT (user_id, event_id) DO UPDATE SET")
 
-        # Setup: get_documents returns user with only 1 event
-        def mock_find(*args, **kwargs):
-            cursor = Mock()
-            cursor.skip.return_value = cursor
-            cursor.limit.return_value = [{
-                '_id': user_id,
-                'registered_events': [event1],  # Only event1 remains
-                'creation_date': datetime.now(),
-                'update_date': datetime.now()
-            }]
-            return cursor
+    assert len(batch_values) == 1
+    assert batch_values[0][0] == user_id
+    assert batch_values[0][1] == event_id
 
-        mock_collection.find = mock_find
-        mock_collection.count_documents.return_value = 1
 
-        mock_conn = Mock()
-        mock_conn.cursor.return_value = mock_cursor
-        mock_cursor.rowcount = 2  # Simulates deleting 2 old relationships
+def _assert_delete_error_recovered(mock_conn, mock_cursor, batch_recorder, user_id, event_id):
+    # Verify rollback was called
+    assert mock_conn.rollback_called
 
-        config = ImportConfig(
-            table_name='user_events',
-            source_collection='users',
-            summary_instance=Mock()
-        )
+    # INSERT should still be attempted
+    assert batch_recorder
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=1) as mock_execute:
-            strategy.export_data(mock_conn, mock_collection, config)
 
-            # Verify DELETE was called
-            assert mock_cursor.execute.called
-            delete_sql = mock_cursor.execute.call_args_list[0][0][0]
-            assert 'DELETE FROM user_events' in delete_sql
+# (id, error raised by cursor.execute, cursor.rowcount, assertion)
+USER_EVENTS_CASES = [
+    # User originally had 2 events, now has only 1: old rows are deleted, current one re-inserted
+    ("removal", None, 2, _assert_event_removal),
+    ("referential", None, 0, _assert_referential_integrity),
+    # Errors during DELETE must not prevent INSERT
+    ("delete_error", Exception("Database error"), 0, _assert_delete_error_recovered),
+]
 
-            # Verify INSERT was called with only 1 relationship
-            batch_values = mock_execute.call_args[0][1]
-            assert len(batch_values) == 1
-            assert batch_values[0][1] == str(event1)
 
-    def test_users_targets_handles_array_changes(self):
+class TestDeleteAndInsertCorrectness:
+    """Test that delete-and-insert pattern correctly handles additions and removals"""
+
+    @pytest.mark.parametrize(
+        "execute_error,rowcount,check",
+        [case[1:] for case in USER_EVENTS_CASES],
+        ids=[case[0] for case in USER_EVENTS_CASES]
+    )
+    def test_user_events_delete_and_insert(self, user_events_strategy, mock_stack, batch_recorder, execute_error, rowcount, check):
+        """Test user_events delete-and-insert scenarios sharing one strategy and mock setup"""
+        mock_conn, mock_cursor, mock_collection = mock_stack
+        user_id = ObjectId()
+        event_id = ObjectId()
+
+        mock_collection.find = make_paginated_find([{
+            '_id': user_id,
+            'registered_events': [event_id],
+            'creation_date': _FIXED_NOW,
+            'update_date': _FIXED_NOW
+        }])
+        mock_collection.count_documents.return_value = 1
+
+        mock_cursor.rowcount = rowcount
+        mock_cursor.execute_error = execute_error
+
+        config = _BASE_CONFIG
+
+        # Should not raise exception
+        user_events_strategy.export_data(mock_conn, mock_collection, config)
+
+        # Rows carry ids as strings; convert once instead of in every assertion
+        check(mock_conn, mock_cursor, batch_recorder, str(user_id), str(event_id))
+
+    def test_users_targets_handles_array_changes(self, users_targets_strategy, mock_stack, batch_recorder):
         """Test that changes to any target array trigger full refresh"""
-        strategy = _create_users_targets_strategy()
+        strategy = users_targets_strategy
+        mock_conn, mock_cursor, mock_collection = mock_stack
         user_id = ObjectId()
         target1 = ObjectId()
         target2 = ObjectId()
@@ -136,297 +360,472 @@ class TestDeleteAndInsertCorrectness:
         # After: targets=[target1], specificity_targets=[target3], health_targets=[]
         # All relationships should be deleted and re-inserted
 
-        mock_collection = Mock()
-
-        def mock_find(*args, **kwargs):
-            cursor = Mock()
-            cursor.skip.return_value = cursor
-            cursor.limit.return_value = [{
-                '_id': user_id,
-                'targets': [target1],  # Removed target2
-                'specificity_targets': [target3],  # Added target3
-                'health_targets': [],
-                'creation_date': datetime.now(),
-                'update_date': datetime.now()
-            }]
-            return cursor
-
-        mock_collection.find = mock_find
+        mock_collection.find = make_paginated_find([{
+            '_id': user_id,
+            'targets': [target1],  # Removed target2
+            'specificity_targets': [target3],  # Added target3
+            'health_targets': [],
+            'creation_date': _FIXED_NOW,
+            'update_date': _FIXED_NOW
+        }])
         mock_collection.count_documents.return_value = 1
 
-        mock_conn = Mock()
-        mock_cursor = Mock()
-        mock_conn.cursor.return_value = mock_cursor
         mock_cursor.rowcount = 2  # Simulates deleting old relationships
 
-        config = ImportConfig(
-            table_name='users_targets',
-            source_collection='users',
-            summary_instance=Mock()
-        )
+        config = replace(_BASE_CONFIG, table_name='users_targets')
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=2) as mock_execute:
-            strategy.export_data(mock_conn, mock_collection, config)
+        strategy.export_data(mock_conn, mock_collection, config)
 
-            # Verify DELETE was called for this user
-            assert mock_cursor.execute.called
-            delete_sql = mock_cursor.execute.call_args_list[0][0][0]
-            assert 'DELETE FROM users_targets' in delete_sql
+        # Verify DELETE was called for this user
+        assert mock_cursor.execute_calls
+        delete_sql = mock_cursor.execute_calls[0][0]
+        assert 'DELETE FROM users_targets' in delete_sql
 
-            # Verify INSERT was called with 2 relationships (1 basic, 1 specificity)
-            batch_values = mock_execute.call_args[0][1]
-            assert len(batch_values) == 2
+        # Verify INSERT was called with 2 relationships (1 basic, 1 specificity)
+        batch_values = batch_recorder[-1][0]
+        assert len(batch_values) == 2
 
-            types = [row[2] for row in batch_values]
-            assert 'basic' in types
-            assert 'specificity' in types
+        types = {row[2] for row in batch_values}
+        assert 'basic' in types
+        assert 'specificity' in types
 
-            # Verify target2 is NOT in the insert (was removed)
-            target_ids = [row[1] for row in batch_values]
-            assert str(target1) in target_ids
-            assert str(target3) in target_ids
-            assert str(target2) not in target_ids
+        # Verify target2 is NOT in the insert (was removed)
+        target_ids = {row[1] for row in batch_values}
+        target1_id, target2_id, target3_id = str(target1), str(target2), str(target3)
+        assert target1_id in target_ids
+        assert target3_id in target_ids
+        assert target2_id not in target_ids
 
 
 class TestDataConsistency:
     """Test that data remains consistent across migrations"""
 
-    def test_incremental_sync_does_not_duplicate_data(self):
+    def test_incremental_sync_does_not_duplicate_data(self, mock_stack, batch_recorder):
         """Test that incremental sync with unchanged data doesn't duplicate records"""
         # This tests DirectTranslationStrategy with ON CONFLICT DO UPDATE
 
         strategy = DirectTranslationStrategy()
+        mock_conn, _, mock_collection = mock_stack
 
         user_id = ObjectId()
         last_migration = datetime(2024, 1, 1)
         current_time = datetime(2024, 1, 15)
 
-        mock_collection = Mock()
-
-        def mock_find(*args, **kwargs):
-            # Return same user document (simulating no changes)
-            return [{
-                '_id': user_id,
-                'name': 'Test User',
-                'email': 'test@example.com',
-                'creation_date': datetime(2023, 12, 1),  # Before last migration
-                'update_date': current_time  # After last migration (triggers re-fetch)
-            }]
-
-        mock_collection.find.return_value = mock_find()
+        # Return same user document (simulating no changes)
+        mock_collection.find = make_paginated_find([{
+            '_id': user_id,
+            'name': 'Test User',
+            'email': 'test@example.com',
+            'creation_date': datetime(2023, 12, 1),  # Before last migration
+            'update_date': current_time  # After last migration (triggers re-fetch)
+        }])
         mock_collection.count_documents.return_value = 1
 
-        mock_conn = Mock()
+        config = replace(_BASE_CONFIG, table_name='users', after_date=last_migration)
 
-        config = ImportConfig(
-            table_name='users',
-            source_collection='users',
-            after_date=last_migration,
-            summary_instance=Mock()
-        )
+        strategy.export_data(mock_conn, mock_collection, config)
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=1) as mock_execute:
-            strategy.export_data(mock_conn, mock_collection, config)
+        # Verify ON CONFLICT DO UPDATE was used
+        batch_values, options = batch_recorder[-1]
+        assert options['use_on_conflict'] is True
 
-            # Verify ON CONFLICT DO UPDATE was used
-            call_args = mock_execute.call_args
-            assert call_args[1]['use_on_conflict'] is True
+        # Record should be updated, not duplicated
+        assert len(batch_values) == 1
 
-            # Record should be updated, not duplicated
-            batch_values = call_args[0][1]
-            assert len(batch_values) == 1
+    def test_find_projects_mapped_fields(self, mock_stack, batch_recorder):
+        """Only the schema's mapped fields, _id and the sync dates are fetched from MongoDB"""
+        mock_conn, _, mock_collection = mock_stack
+        mock_collection.find = make_paginated_find([{'_id': ObjectId(), 'firstname': 'Test'}])
 
-    def test_delete_and_insert_maintains_referential_integrity(self):
-        """Test that delete-and-insert maintains referential integrity"""
-        strategy = _create_user_events_strategy()
-        user_id = ObjectId()
-        valid_event = ObjectId()
+        DirectTranslationStrategy().export_data(mock_conn, mock_collection, replace(_BASE_CONFIG, table_name='users'))
 
-        mock_collection = Mock()
+        (_, projection), = mock_collection.find.calls
+        assert set(projection) == {'_id', 'creation_date', 'update_date', *TABLE_SCHEMAS['users'].mongo_keys}
+        assert 'registered_events' not in projection
 
-        def mock_find(*args, **kwargs):
-            cursor = Mock()
-            cursor.skip.return_value = cursor
-            cursor.limit.return_value = [{
-                '_id': user_id,
-                'registered_events': [valid_event],
-                'creation_date': datetime.now(),
-                'update_date': datetime.now()
-            }]
-            return cursor
+    def test_custom_filter_fetches_whole_documents(self):
+        """A custom_filter may read unmapped fields, so no projection is applied"""
+        config = replace(_BASE_CONFIG, table_name='users', custom_filter=lambda doc: doc.get('active'))
 
-        mock_collection.find = mock_find
-        mock_collection.count_documents.return_value = 1
+        assert DirectTranslationStrategy().get_document_query(config) == ({}, None)
 
-        mock_conn = Mock()
-        mock_cursor = Mock()
-        mock_conn.cursor.return_value = mock_cursor
-
-        config = ImportConfig(
-            table_name='user_events',
-            source_collection='users',
-            summary_instance=Mock()
-        )
+    def test_batch_extraction_matches_per_document_extraction(self):
+        """The batch transform yields the per-document rows and honours custom_filter"""
+        strategy = DirectTranslationStrategy()
+        documents = [
+            {'_id': ObjectId(), 'name': f'Company {i}', 'creation_date': _FIXED_NOW, 'update_date': _FIXED_NOW}
+            for i in range(3)
+        ]
+        config = replace(_BASE_CONFIG, table_name='companies',
+                         custom_filter=lambda doc: doc['name'] != 'Company 1')
+
+        rows, columns = strategy.extract_batch_for_sql(documents, config)
+
+        expected = [strategy.extract_data_for_sql(doc, config) for doc in documents]
+        assert rows == [row for values, _ in expected if values is not None for row in values]
+        assert columns == expected[0][1]
+
+    def test_strategy_without_document_source_fails_at_construction(self):
+        """Defining neither get_document_query() nor get_documents() is rejected when the strategy is built"""
+        class SourcelessStrategy(import_strategies.ImportStrategy):
+            def count_total_documents(self, collection, config):
+                return 0
+
+            def extract_data_for_sql(self, document, config):
+                return None, None
+
+        with pytest.raises(TypeError, match='get_document_query'):
+            SourcelessStrategy()
+
+    def test_get_documents_override_is_used_on_export(self, mock_stack, batch_recorder):
+        """A subclass reshaping documents in get_documents() is not bypassed by cursor streaming"""
+        mock_conn, _, mock_collection = mock_stack
+        mock_collection.count_documents.return_value = 1
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=1) as mock_execute:
-            strategy.export_data(mock_conn, mock_collection, config)
+        class RenamingStrategy(DirectTranslationStrategy):
+            def get_documents(self, collection, config, after_id=None):
+                if after_id is not None:
+                    return []
+                return [{'_id': ObjectId(), 'firstname': 'Renamed', 'creation_date': _FIXED_NOW}]
 
-            # Verify no ON CONFLICT clause (delete-and-insert pattern)
-            call_args = mock_execute.call_args
-            assert call_args[1]['use_on_conflict'] is False
-            assert call_args[1]['on_conflict_clause'] == ""
+        config = replace(_BASE_CONFIG, table_name='users')
+        RenamingStrategy().export_data(mock_conn, mock_collection, config)
 
-            # All inserts should be fresh (no conflicts expected)
-            batch_values = call_args[0][1]
-            assert len(batch_values) == 1
-            assert batch_values[0][0] == str(user_id)
-            assert batch_values[0][1] == str(valid_event)
+        assert not mock_collection.find.called
+        assert 'Renamed' in batch_recorder[-1][0][0]
 
 
 class TestBatchProcessing:
     """Test batch processing behavior"""
 
-    def test_handles_large_batches(self):
+    def test_handles_large_batches(self, user_events_strategy, mock_stack, batch_recorder):
         """Test that large batches are processed correctly"""
-        strategy = _create_user_events_strategy()
-
-        # Create 100 users with events
-        users = []
-        for i in range(100):
-            users.append({
-                '_id': ObjectId(),
-                'registered_events': [ObjectId(), ObjectId()],
-                'creation_date': datetime.now(),
-                'update_date': datetime.now()
-            })
-
-        mock_collection = Mock()
-
-        def mock_find(*args, **kwargs):
-            cursor = Mock()
-            cursor.skip.return_value = cursor
-            cursor.limit.return_value = users
-            return cursor
+        strategy = user_events_strategy
+        mock_conn, _, mock_collection = mock_stack
 
-        mock_collection.find = mock_find
+        # Create 100 users with events; only user ids need to be distinct
+        users = [
+            {
+                '_id': user_id,
+                'registered_events': _EVENT_PAIR,
+                'creation_date': _FIXED_NOW,
+                'update_date': _FIXED_NOW
+            }
+            for user_id in _USER_ID_POOL
+        ]
+
+        mock_collection.find = make_paginated_find(users)
         mock_collection.count_documents.return_value = 100
 
-        mock_conn = Mock()
-        mock_conn.cursor.return_value = Mock()
+        config = replace(_BASE_CONFIG, batch_size=5000)
 
-        config = ImportConfig(
-            table_name='user_events',
-            source_collection='users',
-            batch_size=5000,
-            summary_instance=Mock()
-        )
+        strategy.export_data(mock_conn, mock_collection, config)
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=200) as mock_execute:
-            result = strategy.export_data(mock_conn, mock_collection, config)
+        # Verify all 200 relationships were inserted (100 users × 2 events)
+        batch_values = batch_recorder[-1][0]
+        assert len(batch_values) == 200
 
-            # Verify all 200 relationships were inserted (100 users × 2 events)
-            batch_values = mock_execute.call_args[0][1]
-            assert len(batch_values) == 200
+    def test_smart_diff_stamps_batch_with_one_timestamp(self, mock_stack, batch_recorder):
+        """Rows inserted for every parent of a batch share the timestamp taken once for the batch"""
+        mock_conn, _, mock_collection = mock_stack
+        users = [
+            {'_id': user_id, 'registered_events': _EVENT_PAIR, 'creation_date': _FIXED_NOW}
+            for user_id in _USER_ID_POOL[:3]
+        ]
+        mock_collection.find = make_paginated_find(users)
 
+        class TickingDatetime(datetime):
+            """datetime whose now() moves one second per call"""
+            calls = 0
 
-class TestErrorRecovery:
-    """Test error handling and recovery"""
+            @classmethod
+            def now(cls, tz=None):
+                cls.calls += 1
+                return _FIXED_NOW + timedelta(seconds=cls.calls)
 
-    def test_handles_delete_error_gracefully(self):
-        """Test that errors during DELETE don't prevent INSERT"""
-        strategy = _create_user_events_strategy()
-        user_id = ObjectId()
-        event_id = ObjectId()
+        with patch.object(import_strategies, 'datetime', TickingDatetime):
+            create_user_events_smart_strategy().export_data(mock_conn, mock_collection, _BASE_CONFIG)
 
-        mock_collection = Mock()
+        rows = [row for batch_values, _ in batch_recorder for row in batch_values]
+        assert len(rows) == 6
+        assert TickingDatetime.calls == 1
+        assert {row[2] for row in rows} == {row[3] for row in rows} == {_FIXED_NOW + timedelta(seconds=1)}
 
-        def mock_find(*args, **kwargs):
-            cursor = Mock()
-            cursor.skip.return_value = cursor
-            cursor.limit.return_value = [{
-                '_id': user_id,
-                'registered_events': [event_id],
-                'creation_date': datetime.now(),
-                'update_date': datetime.now()
-            }]
-            return cursor
 
-        mock_collection.find = mock_find
-        mock_collection.count_documents.return_value = 1
+class TestMongoFilters:
+    """Test that combined MongoDB filters never overwrite each other's conditions"""
 
-        # Setup mock connection to raise error on DELETE
-        mock_conn = Mock()
-        mock_cursor = Mock()
-        mock_cursor.execute.side_effect = Exception("Database error")
-        mock_conn.cursor.return_value = mock_cursor
+    def test_keyset_page_keeps_existing_id_condition(self):
+        """An _id filter from the strategy and the keyset range are both applied"""
+        from src.migration.repositories.mongo_repo import MongoRepository
 
-        config = ImportConfig(
-            table_name='user_events',
-            source_collection='users',
-            summary_instance=Mock()
-        )
+        allowed, last_id = [ObjectId(), ObjectId()], ObjectId()
+        collection = Mock()
+        collection.find = make_paginated_find()
+
+        MongoRepository.find_documents(collection, extra_filter={'_id': {'$in': allowed}}, after_id=last_id)
+
+        (query, _), = collection.find.calls
+        assert query == {'$and': [{'_id': {'$in': allowed}}, {'_id': {'$gt': last_id}}]}
+
+    def test_date_filter_keeps_array_or(self):
+        """A strategy's own $or survives the date $or added for incremental runs"""
+        from src.migration.repositories.mongo_repo import MongoRepository
+
+        arrays = {'$or': [{'targets': {'$exists': True}}, {'health_targets': {'$exists': True}}]}
+
+        query = MongoRepository.build_query(_FIXED_NOW, arrays)
+
+        assert query == {'$and': [arrays, MongoRepository.build_date_filter(_FIXED_NOW)]}
+
+    def test_disjoint_filters_merge_into_one_document(self):
+        """Filters on different keys stay a plain document, as before"""
+        from src.migration.repositories.mongo_repo import MongoRepository
+
+        query = MongoRepository.build_query(_FIXED_NOW, {'registered_events': {'$ne': []}})
+
+        assert query == {'registered_events': {'$ne': []}, **MongoRepository.build_date_filter(_FIXED_NOW)}
+
+
+class TestPrefetchBatches:
+    """Test the reader thread overlapping MongoDB reads with PostgreSQL writes"""
+
+    def test_batches_arrive_in_order(self):
+        """Prefetched batches are yielded exactly as the source produced them"""
+        batches = [[i] for i in range(10)]
+
+        assert list(prefetch_batches(iter(batches), 2)) == batches
+
+    def test_read_error_reaches_consumer(self):
+        """An exception raised by the source is re-raised after the batches read before it"""
+        def failing_batches():
+            yield [1]
+            raise RuntimeError("cursor lost")
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=1) as mock_execute:
-            # Should not raise exception
-            result = strategy.export_data(mock_conn, mock_collection, config)
+        consumed = []
+        with pytest.raises(RuntimeError, match="cursor lost"):
+            for batch in prefetch_batches(failing_batches(), 2):
+                consumed.append(batch)
 
-            # Verify rollback was called
-            assert mock_conn.rollback.called
+        assert consumed == [[1]]
 
-            # INSERT should still be attempted
-            assert mock_execute.called
+    def test_closing_early_stops_the_reader(self):
+        """Abandoning the export closes the source instead of draining it"""
+        closed = []
+
+        def endless_batches():
+            try:
+                while True:
+                    yield [0]
+            finally:
+                closed.append(True)
+
+        prefetched = prefetch_batches(endless_batches(), 2)
+        next(prefetched)
+        prefetched.close()
+
+        assert closed == [True]
 
 
 class TestMigrationPerformance:
     """Test performance-related aspects"""
 
-    def test_uses_pagination_for_large_datasets(self):
-        """Test that pagination is used correctly for large datasets"""
-        strategy = _create_user_events_strategy()
-
-        call_count = [0]
-
-        def mock_find(*args, **kwargs):
-            call_count[0] += 1
-            cursor = Mock()
-            cursor.skip.return_value = cursor
-
-            # First call returns full batch, second returns empty
-            if call_count[0] == 1:
-                cursor.limit.return_value = [
-                    {
-                        '_id': ObjectId(),
-                        'registered_events': [ObjectId()],
-                        'creation_date': datetime.now(),
-                        'update_date': datetime.now()
-                    }
-                    for _ in range(5000)  # Full batch
-                ]
-            else:
-                cursor.limit.return_value = []  # No more data
-
-            return cursor
-
-        mock_collection = Mock()
+    def test_uses_pagination_for_large_datasets(self, user_events_strategy, mock_stack, batch_recorder):
+        """Batches of a large dataset are read from one streamed cursor, not re-queried"""
+        strategy = user_events_strategy
+        mock_conn, _, mock_collection = mock_stack
+
+        # The whole result set sits behind the first find(); any further query would see nothing
+        mock_find = make_paginated_find([_TEMPLATE_DOC] * 5000)
         mock_collection.find = mock_find
-        mock_collection.count_documents.return_value = 5000
 
-        mock_conn = Mock()
-        mock_conn.cursor.return_value = Mock()
+        config = replace(_BASE_CONFIG, batch_size=2000)
+
+        strategy.export_data(mock_conn, mock_collection, config)
+
+        # Three batches (2000 + 2000 + 1000 users) from a single cursor
+        assert len(mock_find.calls) == 1
+        assert [len(values) for values, _ in batch_recorder] == [2000, 2000, 1000]
+
+    def test_empty_table_is_skipped_without_counting(self, user_events_strategy, mock_stack, batch_recorder):
+        """An empty first batch ends the export; no count_documents() scan is issued"""
+        mock_conn, _, mock_collection = mock_stack
+        mock_collection.find = make_paginated_find()
+
+        user_events_strategy.export_data(mock_conn, mock_collection, _BASE_CONFIG)
 
-        config = ImportConfig(
-            table_name='user_events',
-            source_collection='users',
-            batch_size=5000,
-            summary_instance=Mock()
+        assert not mock_collection.count_documents.called
+        assert batch_recorder == []
+
+    def test_progress_count_is_opt_in(self, mock_stack, batch_recorder, monkeypatch):
+        """COUNT_DOCUMENTS_FOR_PROGRESS restores the count; without a date filter it reads metadata"""
+        monkeypatch.setattr(import_strategies, 'COUNT_DOCUMENTS_FOR_PROGRESS', True)
+        mock_conn, _, mock_collection = mock_stack
+        mock_collection.find = make_paginated_find()
+        mock_collection.estimated_document_count.return_value = 0
+        strategy = DirectTranslationStrategy()
+
+        strategy.export_data(mock_conn, mock_collection, replace(_BASE_CONFIG, table_name='companies'))
+
+        mock_collection.estimated_document_count.assert_called_once_with()
+        assert not mock_collection.count_documents.called
+
+    def test_array_extraction_prefetch_is_chunked_and_released(self, mock_stack, batch_recorder):
+        """Child lookups stay within batch_size per $in and are dropped once the export ends"""
+        mock_conn, _, _ = mock_stack
+        child_ids = [ObjectId() for _ in range(5)]
+        parents = [{'_id': ObjectId(), 'items': child_ids, 'creation_date': _FIXED_NOW}]
+        parent_collection = Mock()
+        parent_collection.find = make_paginated_find(parents)
+        parent_collection.count_documents.return_value = 1
+        child_collection = Mock()
+        child_collection.find.side_effect = lambda query, projection: [
+            {'_id': child_id} for child_id in query['_id']['$in']
+        ]
+        strategy = ArrayExtractionStrategy(ArrayExtractionConfig(
+            parent_collection='parents',
+            array_field='items',
+            child_collection='children',
+            sql_columns=['id', 'parent_id', 'created_at', 'updated_at']
+        ))
+        config = replace(_BASE_CONFIG, table_name='children', source_collection='parents', batch_size=2)
+
+        collections = {'parents': parent_collection, 'children': child_collection}
+        with patch('src.connections.mongo_connection.get_mongo_collection', side_effect=collections.get):
+            strategy.export_data(mock_conn, parent_collection, config)
+
+        in_sizes = [len(c.args[0]['_id']['$in']) for c in child_collection.find.call_args_list]
+        assert in_sizes == [2, 2, 1]
+        assert len(batch_recorder[-1][0]) == 5
+        assert strategy._child_docs is None
+
+    def test_array_extraction_config_checks_transformer_without_calling_it(self):
+        """The transformer's signature is validated at construction; the function itself never runs"""
+        transformer = Mock(side_effect=AssertionError("transformer must not run at construction"))
+        transformer.__signature__ = inspect.signature(lambda parent_id, child_doc: None)
+
+        ArrayExtractionConfig('parents', 'items', sql_columns=['a', 'b'], value_transformer=transformer)
+        assert not transformer.called
+
+        with pytest.raises(ValueError, match='must accept'):
+            ArrayExtractionConfig('parents', 'items', sql_columns=['a'], value_transformer=lambda parent_id: ())
+
+
+# Real-database tests run only when a scratch PostgreSQL is available, e.g.
+# TEST_POSTGRES_DSN=postgresql://postgres@localhost/postgres
+_TEST_POSTGRES_DSN = os.getenv('TEST_POSTGRES_DSN')
+_THROUGHPUT_ROWS = 10000
+_THROUGHPUT_BATCH_SIZES = (100, 1000, 10000)
+
+
+@pytest.fixture(scope="module")
+def pg_conn():
+    """Connection to TEST_POSTGRES_DSN with users (and companies, its FK target) in a throwaway schema"""
+    import psycopg2
+
+    conn = psycopg2.connect(_TEST_POSTGRES_DSN)
+    cursor = conn.cursor()
+    cursor.execute("DROP SCHEMA IF EXISTS migration_throughput CASCADE")
+    cursor.execute("CREATE SCHEMA migration_throughput")
+    cursor.execute("SET search_path TO migration_throughput")
+    cursor.execute(TABLE_SCHEMAS['companies'].get_create_sql())
+    cursor.execute(TABLE_SCHEMAS['users'].get_create_sql())
+    conn.commit()
+    yield conn
+    conn.rollback()
+    cursor.execute("DROP SCHEMA migration_throughput CASCADE")
+    conn.commit()
+    conn.close()
+
+
+def _export_users(conn, batch_size):
+    """Import _THROUGHPUT_ROWS fresh users; return (elapsed seconds, rows in the table)"""
+    cursor = conn.cursor()
+    cursor.execute("TRUNCATE users CASCADE")
+    conn.commit()
+    documents = [
+        {'_id': ObjectId(), 'firstname': 'First', 'lastname': 'Last', 'email': 'user@example.com',
+         'role': 'CUSTOMER', 'creation_date': _FIXED_NOW, 'update_date': _FIXED_NOW}
+        for _ in range(_THROUGHPUT_ROWS)
+    ]
+    collection = Mock()
+    collection.find = make_paginated_find(documents)
+    collection.count_documents.return_value = len(documents)
+    config = replace(_BASE_CONFIG, table_name='users', batch_size=batch_size)
+
+    start = time.perf_counter()
+    DirectTranslationStrategy().export_data(conn, collection, config)
+    elapsed = time.perf_counter() - start
+
+    cursor.execute("SELECT COUNT(*) FROM users")
+    return elapsed, cursor.fetchone()[0]
+
+
+@pytest.mark.skipif(not _TEST_POSTGRES_DSN, reason="TEST_POSTGRES_DSN not set")
+class TestRealPostgresCheckpoints:
+    """Checkpoints must not outlive the rows they describe"""
+
+    @pytest.fixture
+    def checkpoints(self, pg_conn):
+        from src.migration.data_export import CREATE_CHECKPOINTS_SQL, save_sync_checkpoint
+
+        cursor = pg_conn.cursor()
+        cursor.execute(CREATE_CHECKPOINTS_SQL)
+        cursor.execute("TRUNCATE companies, migration_checkpoints CASCADE")
+        pg_conn.commit()
+        for table_name in ('companies', 'users'):
+            save_sync_checkpoint(pg_conn, table_name, _FIXED_NOW)
+        return cursor
+
+    def test_truncate_cascade_forgets_dependent_checkpoints(self, pg_conn, checkpoints):
+        """Deleting the checkpoint of companies also drops the one of users, which references it"""
+        from src.migration.data_export import delete_sync_checkpoints
+
+        deleted = delete_sync_checkpoints(pg_conn, 'companies')
+
+        checkpoints.execute("SELECT table_name FROM migration_checkpoints")
+        assert deleted == 2
+        assert checkpoints.fetchall() == []
+
+    def test_checkpoint_of_empty_table_is_ignored(self, pg_conn, checkpoints):
+        """A table emptied outside the migration is imported in full again"""
+        assert get_last_insert_date(pg_conn, 'companies') is None
+
+        checkpoints.execute(
+            "INSERT INTO companies (id, name, created_at, updated_at) VALUES ('c1', 'Company', %s, %s)",
+            (_FIXED_NOW, _FIXED_NOW),
         )
+        pg_conn.commit()
+        assert get_last_insert_date(pg_conn, 'companies') == _FIXED_NOW
+
+
+@pytest.mark.skipif(not _TEST_POSTGRES_DSN, reason="TEST_POSTGRES_DSN not set")
+class TestRealPostgresBatchSizes:
+    """Run DirectTranslationStrategy against a real PostgreSQL instead of a stubbed execute_batch"""
+
+    @pytest.mark.parametrize("batch_size", _THROUGHPUT_BATCH_SIZES)
+    def test_export_writes_every_row(self, pg_conn, batch_size, capsys):
+        """Every document lands exactly once whatever the batch size"""
+        _, row_count = _export_users(pg_conn, batch_size)
+
+        assert row_count == _THROUGHPUT_ROWS
+
+    @pytest.mark.parametrize("batch_size", _THROUGHPUT_BATCH_SIZES)
+    def test_one_insert_statement_per_batch(self, pg_conn, batch_size, capsys):
+        """Each batch reaches the server as a single multi-row INSERT.
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=5000):
-            strategy.export_data(mock_conn, mock_collection, config)
+        Round-trips are counted rather than timed, so the check holds on a loaded
+        server; the elapsed time is only reported.
+        """
+        from src.migration.repositories import postgres_repo
 
-            # Verify find was called twice (pagination)
-            assert call_count[0] == 2
+        with patch.object(postgres_repo, 'execute_values', wraps=postgres_repo.execute_values) as insert:
+            elapsed, row_count = _export_users(pg_conn, batch_size)
 
+        assert row_count == _THROUGHPUT_ROWS
+        assert insert.call_count == -(-_THROUGHPUT_ROWS // batch_size)
+        with capsys.disabled():
+            print(f"\n{_THROUGHPUT_ROWS} users in batches of {batch_size}: {elapsed:.2f}s")
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
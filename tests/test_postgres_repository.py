@@ -0,0 +1,207 @@
+"""
+Tests for PostgresRepository
+
+Tests the INSERT paths:
+- One multi-row INSERT per batch through execute_values
+- PREPARE/EXECUTE statement text, including the ON CONFLICT ... WHERE guard
+- Reuse of statements already prepared on the session
+- Per-row savepoint fallback when a batch hits an integrity error
+"""
+
+import re
+import pytest
+import psycopg2
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from src.migration.repositories.postgres_repo import (
+    PostgresRepository, build_prepared_insert, build_values_insert
+)
+from src.schemas.schemas import TABLE_SCHEMAS
+
+
+COLUMNS = ['id', 'name', 'created_at', 'updated_at']
+ROWS = [('c1', 'Company 1', None, None), ('c2', 'Company 2', None, None)]
+CONFLICT_CLAUSE = (
+    " ON CONFLICT (id) DO UPDATE SET created_at = EXCLUDED.created_at, "
+    "updated_at = EXCLUDED.updated_at, name = EXCLUDED.name "
+    "WHERE companies.updated_at IS DISTINCT FROM EXCLUDED.updated_at OR EXCLUDED.updated_at IS NULL"
+)
+
+
+class RecordingCursor:
+    """psycopg2 cursor stand-in recording execute calls, including those made by execute_values"""
+
+    connection = SimpleNamespace(encoding='UTF8')
+
+    def __init__(self, prepared=False, batch_error=None, failing_rows=()):
+        self.prepared = prepared
+        self.batch_error = batch_error
+        self.failing_rows = failing_rows
+        self.statements = []
+        self.rowcount = 0
+
+    def mogrify(self, template, args):
+        return repr(tuple(args)).encode()
+
+    def execute(self, sql, params=None):
+        if isinstance(sql, bytes):
+            # Multi-row INSERT assembled by execute_values
+            sql = sql.decode()
+            self.statements.append((sql, params))
+            if self.batch_error is not None:
+                raise self.batch_error
+            self.rowcount = sql.count('),(') + 1
+            return
+        self.statements.append((sql, params))
+        if sql.startswith('EXECUTE') and params in self.failing_rows:
+            raise psycopg2.IntegrityError('violates foreign key constraint')
+
+    def fetchone(self):
+        return (1,) if self.prepared else None
+
+    def close(self):
+        pass
+
+    def sql(self):
+        return [sql for sql, _ in self.statements]
+
+
+def make_repository(cursor, **options):
+    conn = Mock()
+    conn.cursor.return_value = cursor
+    return PostgresRepository(conn, summary_instance=Mock(), **options)
+
+
+class TestBatchInsert:
+    """Test the multi-row INSERT used for whole batches"""
+
+    def test_schema_conflict_clause_keeps_updated_at_guard(self):
+        """The clause passed to the repository is the schema's guarded upsert"""
+        assert TABLE_SCHEMAS['companies'].get_on_conflict_clause(COLUMNS) == CONFLICT_CLAUSE
+
+    def test_batch_is_one_multi_row_insert(self):
+        """The whole batch goes out as a single INSERT ... VALUES statement"""
+        cursor = RecordingCursor()
+        repository = make_repository(cursor)
+
+        inserted = repository.execute_batch(
+            ROWS, COLUMNS, 'companies', use_on_conflict=True, on_conflict_clause=CONFLICT_CLAUSE
+        )
+
+        assert inserted == 2
+        assert build_values_insert('companies', tuple(COLUMNS), CONFLICT_CLAUSE) == (
+            f"INSERT INTO companies (id, name, created_at, updated_at) VALUES %s{CONFLICT_CLAUSE}"
+        )
+        inserts = [sql for sql in cursor.sql() if sql.startswith('INSERT')]
+        assert inserts == [
+            "INSERT INTO companies (id, name, created_at, updated_at) VALUES "
+            f"('c1', 'Company 1', None, None),('c2', 'Company 2', None, None){CONFLICT_CLAUSE}"
+        ]
+
+    def test_batch_without_errors_prepares_nothing(self):
+        """Statements are only prepared once a batch falls back to row-by-row inserts"""
+        cursor = RecordingCursor()
+        repository = make_repository(cursor)
+
+        repository.execute_batch(ROWS, COLUMNS, 'companies')
+
+        assert not any(sql.startswith(('SELECT', 'PREPARE', 'EXECUTE')) for sql in cursor.sql())
+
+
+class TestPreparedInsert:
+    """Test PREPARE/EXECUTE generation and reuse"""
+
+    def test_prepare_and_execute_sql(self):
+        """The INSERT is prepared with positional parameters and run through EXECUTE"""
+        cursor = RecordingCursor()
+        repository = make_repository(cursor, import_by_batch=False)
+
+        inserted = repository.execute_batch(
+            ROWS, COLUMNS, 'companies', use_on_conflict=True, on_conflict_clause=CONFLICT_CLAUSE
+        )
+
+        assert inserted == 2
+        name, _, _ = build_prepared_insert('companies', tuple(COLUMNS), CONFLICT_CLAUSE)
+        assert re.fullmatch(r'insert_[0-9a-f]{16}', name)
+        assert cursor.statements[0] == ("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (name,))
+        assert cursor.sql()[1] == (
+            f"PREPARE {name} AS INSERT INTO companies (id, name, created_at, updated_at) "
+            f"VALUES ($1, $2, $3, $4){CONFLICT_CLAUSE}"
+        )
+        assert (f"EXECUTE {name} (%s, %s, %s, %s)", ROWS[0]) in cursor.statements
+
+    def test_prepare_skipped_when_session_has_statement(self):
+        """A statement already listed in pg_prepared_statements is not prepared again"""
+        cursor = RecordingCursor(prepared=True)
+        repository = make_repository(cursor, import_by_batch=False)
+
+        repository.execute_batch(ROWS, COLUMNS, 'companies', use_on_conflict=True,
+                                 on_conflict_clause=CONFLICT_CLAUSE)
+
+        assert not any(sql.startswith('PREPARE') for sql in cursor.sql())
+
+    def test_prepared_lookup_runs_once_per_repository(self):
+        """Later batches of the same shape skip both the lookup and the PREPARE"""
+        cursor = RecordingCursor()
+        repository = make_repository(cursor, import_by_batch=False)
+
+        for _ in range(2):
+            repository.execute_batch(ROWS, COLUMNS, 'companies', use_on_conflict=True,
+                                     on_conflict_clause=CONFLICT_CLAUSE)
+
+        sql = cursor.sql()
+        assert sum(s.startswith('SELECT 1 FROM pg_prepared_statements') for s in sql) == 1
+        assert sum(s.startswith('PREPARE') for s in sql) == 1
+
+
+class TestSavepointFallback:
+    """Test row-by-row retries through the prepared statement"""
+
+    def test_batch_integrity_error_retries_each_row(self):
+        """A failing batch is rolled back to its savepoint and retried row by row with EXECUTE"""
+        cursor = RecordingCursor(batch_error=psycopg2.IntegrityError('duplicate'),
+                                 failing_rows=(ROWS[1],))
+        repository = make_repository(cursor)
+
+        inserted = repository.execute_batch(ROWS, COLUMNS, 'companies')
+
+        _, _, execute_sql = build_prepared_insert('companies', tuple(COLUMNS), "")
+        assert inserted == 1
+        assert "ROLLBACK TO SAVEPOINT batch_insert" in cursor.sql()
+        retries = [params for sql, params in cursor.statements if sql == execute_sql]
+        assert retries == ROWS
+        assert cursor.sql().count("RELEASE SAVEPOINT individual_retry") == 1
+        assert cursor.sql().count("ROLLBACK TO SAVEPOINT individual_retry") == 1
+        repository.summary.record_error.assert_called_once()
+        assert repository.summary.record_error.call_args.args[1] == 'Foreign key constraint'
+
+    def test_duplicate_ids_in_batch_retry_each_row(self):
+        """An upsert batch naming one id twice is applied row by row, in order"""
+        cursor = RecordingCursor(batch_error=psycopg2.errors.CardinalityViolation('affect row a second time'))
+        repository = make_repository(cursor)
+
+        inserted = repository.execute_batch(ROWS, COLUMNS, 'companies', use_on_conflict=True,
+                                            on_conflict_clause=CONFLICT_CLAUSE)
+
+        _, _, execute_sql = build_prepared_insert('companies', tuple(COLUMNS), CONFLICT_CLAUSE)
+        assert inserted == 2
+        assert [params for sql, params in cursor.statements if sql == execute_sql] == ROWS
+
+    def test_row_by_row_mode_uses_execute(self):
+        """With import_by_batch disabled every row gets its own savepoint around EXECUTE"""
+        cursor = RecordingCursor(failing_rows=(ROWS[0],))
+        repository = make_repository(cursor, import_by_batch=False)
+
+        inserted = repository.execute_batch(ROWS, COLUMNS, 'companies')
+
+        _, _, execute_sql = build_prepared_insert('companies', tuple(COLUMNS), "")
+        assert inserted == 1
+        assert [params for sql, params in cursor.statements if sql == execute_sql] == ROWS
+        assert cursor.sql().count("SAVEPOINT individual_insert") == 2
+        assert cursor.sql().count("ROLLBACK TO SAVEPOINT individual_insert") == 1
+        repository.conn.commit.assert_called_once()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -14,6 +14,7 @@ from bson import ObjectId
 from datetime import datetime
 
 from src.migration.import_strategies import ImportConfig, DirectTranslationStrategy
+from src.migration.repositories.postgres_repo import PostgresRepository
 
 
 class TestExplicitFourStepFlow:
@@ -23,7 +24,6 @@ class TestExplicitFourStepFlow:
     def mock_strategy(self):
         """Create a mock strategy with all required methods"""
         strategy = Mock(spec=DirectTranslationStrategy)
-        strategy.count_total_documents.return_value = 2
         strategy.get_use_on_conflict.return_value = True
         strategy.get_on_conflict_clause.return_value = " ON CONFLICT (id) DO UPDATE SET updated_at = EXCLUDED.updated_at"
         return strategy
@@ -49,7 +49,7 @@ class TestExplicitFourStepFlow:
         ]
 
     def test_step1_get_last_migration_date(self):
-        """Test Step 1: Getting last migration date from PostgreSQL"""
+        """Test Step 1: Getting last migration date from the PostgreSQL checkpoint table"""
         mock_conn = Mock()
         mock_cursor = Mock()
         mock_conn.cursor.return_value = mock_cursor
@@ -63,31 +63,36 @@ class TestExplicitFourStepFlow:
         # Verify the result
         assert result == last_date
 
-        # Verify correct SQL was executed
-        assert mock_cursor.execute.called
-        sql = mock_cursor.execute.call_args[0][0]
-        assert 'GREATEST' in sql
-        assert 'MAX(created_at)' in sql
-        assert 'MAX(updated_at)' in sql
-        assert 'test_table' in sql
+        # One primary-key lookup guarded by an emptiness probe, no MAX() over the table
+        mock_cursor.execute.assert_called_once_with(
+            "SELECT last_sync_at FROM migration_checkpoints "
+            "WHERE table_name = %s AND EXISTS (SELECT 1 FROM test_table)", ('test_table',)
+        )
 
-    def test_step2_count_documents(self, mock_strategy):
-        """Test Step 2: Counting documents from MongoDB"""
+    def test_step2_fetches_first_batch_without_counting(self, mock_documents):
+        """Test Step 2: The first batch is read from the date-filtered cursor, without an up-front count"""
+        cursor = MagicMock()
+        cursor.sort.return_value = cursor
+        cursor.batch_size.return_value = cursor
+        cursor.__iter__.return_value = iter(mock_documents)
         mock_collection = Mock()
-        mock_collection.count_documents.return_value = 150
+        mock_collection.find.return_value = cursor
 
         config = ImportConfig(
-            table_name='test_table',
-            source_collection='test_collection',
+            table_name='users',
+            source_collection='users',
             after_date=datetime(2024, 1, 1),
             summary_instance=Mock()
         )
 
-        # Simulate Step 2
-        total_documents = mock_strategy.count_total_documents(mock_collection, config)
+        first_batch = next(DirectTranslationStrategy().iter_export_batches(mock_collection, config), [])
 
-        assert total_documents == 2
-        assert mock_strategy.count_total_documents.called
+        assert first_batch == mock_documents
+        query = mock_collection.find.call_args.args[0]
+        assert query['$or'] == [{'creation_date': {'$gte': datetime(2024, 1, 1)}},
+                                {'update_date': {'$gte': datetime(2024, 1, 1)}}]
+        assert not mock_collection.count_documents.called
+        assert not mock_collection.estimated_document_count.called
 
     def test_step3_transform_single_document(self, mock_strategy, mock_documents):
         """Test Step 3: Transforming a single document to SQL"""
@@ -98,10 +103,10 @@ class TestExplicitFourStepFlow:
             summary_instance=Mock()
         )
 
-        # Mock the extract_data_for_sql to return realistic data
+        # Mock the extract_data_for_sql to return realistic data: a one-row list
         mock_strategy.extract_data_for_sql.return_value = (
-            [str(document['_id']), document['name'], document['email'],
-             document['creation_date'], document['update_date']],
+            [[str(document['_id']), document['name'], document['email'],
+              document['creation_date'], document['update_date']]],
             ['id', 'name', 'email', 'created_at', 'updated_at']
         )
 
@@ -109,9 +114,11 @@ class TestExplicitFourStepFlow:
         values, columns = mock_strategy.extract_data_for_sql(document, config)
 
         assert columns == ['id', 'name', 'email', 'created_at', 'updated_at']
-        assert len(values) == 5
-        assert values[1] == 'Test User 1'
-        assert values[2] == 'user1@test.com'
+        assert len(values) == 1
+        row, = values
+        assert len(row) == 5
+        assert row[1] == 'Test User 1'
+        assert row[2] == 'user1@test.com'
 
     def test_step3_transform_batch_of_documents(self, mock_strategy, mock_documents):
         """Test Step 3: Transforming multiple documents in a batch"""
@@ -126,7 +133,7 @@ class TestExplicitFourStepFlow:
         mock_strategy.get_documents.return_value = mock_documents
 
         # Simulate fetching documents
-        documents = mock_strategy.get_documents(mock_collection, config, offset=0)
+        documents = mock_strategy.get_documents(mock_collection, config)
 
         assert len(documents) == 2
         assert documents[0]['name'] == 'Test User 1'
@@ -167,7 +174,7 @@ class TestExplicitFourStepFlow:
 
     def test_step4_upsert_with_on_conflict(self, mock_strategy):
         """Test Step 4: INSERT with ON CONFLICT DO UPDATE (upsert)"""
-        from src.migration.import_strategies import ImportUtils
+        from src.migration.repositories.postgres_repo import PostgresRepository
 
         mock_conn = Mock()
         batch_values = [
@@ -176,17 +183,15 @@ class TestExplicitFourStepFlow:
         ]
         columns = ['id', 'name', 'email', 'created_at', 'updated_at']
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=2) as mock_execute:
+        with patch.object(PostgresRepository, 'execute_batch', return_value=2) as mock_execute:
             # Simulate Step 4 with upsert
             use_on_conflict = True
             on_conflict_clause = " ON CONFLICT (id) DO UPDATE SET updated_at = EXCLUDED.updated_at"
 
-            actual_insertions = ImportUtils.execute_batch(
-                mock_conn,
+            actual_insertions = PostgresRepository(mock_conn, Mock()).execute_batch(
                 batch_values,
                 columns,
                 'users',
-                Mock(),
                 use_on_conflict=use_on_conflict,
                 on_conflict_clause=on_conflict_clause
             )
@@ -195,9 +200,9 @@ class TestExplicitFourStepFlow:
             assert mock_execute.called
 
             # Verify parameters
-            call_args = mock_execute.call_args
-            assert call_args[1]['use_on_conflict'] is True
-            assert 'ON CONFLICT' in call_args[1]['on_conflict_clause']
+            options = mock_execute.call_args.kwargs
+            assert options['use_on_conflict'] is True
+            assert 'ON CONFLICT' in options['on_conflict_clause']
 
     def test_step4_delete_and_insert_pattern(self):
         """Test Step 4: DELETE + INSERT pattern for relationships"""
@@ -208,9 +213,9 @@ class TestExplicitFourStepFlow:
             def count_total_documents(self, collection, config):
                 return 1
 
-            def get_documents(self, collection, config, offset=0):
-                if offset == 0:
-                    return [{'_id': ObjectId(), 'items': ['a', 'b']}]
+            def get_documents(self, collection, config, after_id=None):
+                if after_id is None:
+                    return [{'_id': ObjectId(), 'items': ['a', 'b']} for _ in range(3)]
                 return []
 
             def extract_data_for_sql(self, document, config):
@@ -241,23 +246,19 @@ class TestExplicitFourStepFlow:
             summary_instance=Mock()
         )
 
-        # Simulate the DELETE step
-        parent_ids = ['user_id_1']
-        delete_table = strategy.get_delete_table_name(config)
-        delete_column = strategy.get_delete_column_name()
-        placeholders = ', '.join(['%s'] * len(parent_ids))
-        delete_sql = f"DELETE FROM {delete_table} WHERE {delete_column} IN ({placeholders})"
+        with patch.object(PostgresRepository, 'execute_batch', return_value=6):
+            strategy.export_data(mock_conn, Mock(), config)
 
-        mock_cursor.execute(delete_sql, parent_ids)
-        deleted_count = mock_cursor.rowcount
-
-        assert deleted_count == 2
-        assert 'DELETE FROM test_relationships' in delete_sql
-        assert 'WHERE user_id IN' in delete_sql
+        # One DELETE for the whole batch, with every parent id in a single array parameter
+        deletes = [c for c in mock_cursor.execute.call_args_list if c.args[0].startswith('DELETE')]
+        assert len(deletes) == 1
+        delete_sql, (parent_ids,) = deletes[0].args
+        assert delete_sql == "DELETE FROM test_relationships WHERE user_id = ANY(%s)"
+        assert isinstance(parent_ids, list) and len(parent_ids) == 3
 
     def test_full_migration_flow_for_simple_table(self, mock_documents):
         """Test complete flow for a simple table (DirectTranslationStrategy)"""
-        from src.migration.import_strategies import ImportUtils
+        from src.migration.repositories.postgres_repo import PostgresRepository
 
         # Setup mocks
         mock_conn = Mock()
@@ -277,15 +278,12 @@ class TestExplicitFourStepFlow:
         mock_conn.cursor.return_value = mock_cursor
         mock_cursor.fetchone.return_value = (datetime(2024, 1, 1),)
 
-        # Step 2: Mock document count
-        mock_strategy.count_total_documents.return_value = 2
-
         # Step 3: Mock document fetch and transform
         mock_strategy.get_documents.return_value = mock_documents
         mock_strategy.extract_data_for_sql.side_effect = [
-            ([str(mock_documents[0]['_id']), 'User 1', 'user1@test.com', datetime.now(), datetime.now()],
+            ([[str(mock_documents[0]['_id']), 'User 1', 'user1@test.com', datetime.now(), datetime.now()]],
              ['id', 'name', 'email', 'created_at', 'updated_at']),
-            ([str(mock_documents[1]['_id']), 'User 2', 'user2@test.com', datetime.now(), datetime.now()],
+            ([[str(mock_documents[1]['_id']), 'User 2', 'user2@test.com', datetime.now(), datetime.now()]],
              ['id', 'name', 'email', 'created_at', 'updated_at'])
         ]
 
@@ -293,12 +291,9 @@ class TestExplicitFourStepFlow:
         mock_strategy.get_use_on_conflict.return_value = True
         mock_strategy.get_on_conflict_clause.return_value = " ON CONFLICT (id) DO UPDATE SET updated_at = EXCLUDED.updated_at"
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=2) as mock_execute:
+        with patch.object(PostgresRepository, 'execute_batch', return_value=2) as mock_execute:
             # Execute the flow
-            total_documents = mock_strategy.count_total_documents(mock_collection, config)
-            assert total_documents == 2
-
-            documents = mock_strategy.get_documents(mock_collection, config, offset=0)
+            documents = mock_strategy.get_documents(mock_collection, config)
             assert len(documents) == 2
 
             all_batch_values = []
@@ -307,7 +302,7 @@ class TestExplicitFourStepFlow:
                 values, doc_columns = mock_strategy.extract_data_for_sql(doc, config)
                 if columns is None:
                     columns = doc_columns
-                all_batch_values.append(values)
+                all_batch_values.extend(values)
 
             assert len(all_batch_values) == 2
 
@@ -315,9 +310,8 @@ class TestExplicitFourStepFlow:
             use_on_conflict = mock_strategy.get_use_on_conflict()
             on_conflict_clause = mock_strategy.get_on_conflict_clause('users', columns)
 
-            actual_insertions = ImportUtils.execute_batch(
-                mock_conn, all_batch_values, columns, 'users',
-                config.summary_instance, use_on_conflict, on_conflict_clause
+            actual_insertions = PostgresRepository(mock_conn, config.summary_instance).execute_batch(
+                all_batch_values, columns, 'users', use_on_conflict, on_conflict_clause
             )
 
             assert actual_insertions == 2
@@ -325,11 +319,10 @@ class TestExplicitFourStepFlow:
 
     def test_full_migration_flow_for_relationship_table(self):
         """Test complete flow for relationship table (DeleteAndInsertStrategy)"""
-        from src.migration.import_strategies import ImportUtils
+        from src.migration.repositories.postgres_repo import PostgresRepository
 
         # Setup DeleteAndInsertStrategy mock
         mock_strategy = Mock()
-        mock_strategy.count_total_documents.return_value = 1
 
         user_id = ObjectId()
         mock_strategy.get_documents.return_value = [{
@@ -362,33 +355,30 @@ class TestExplicitFourStepFlow:
             summary_instance=Mock()
         )
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=2) as mock_execute:
-            # Step 2
-            total_documents = mock_strategy.count_total_documents(mock_collection, config)
-            assert total_documents == 1
-
-            # Step 3
-            documents = mock_strategy.get_documents(mock_collection, config, offset=0)
+        with patch.object(PostgresRepository, 'execute_batch', return_value=2) as mock_execute:
+            # Steps 2-3
+            documents = mock_strategy.get_documents(mock_collection, config)
             assert len(documents) == 1
 
             document = documents[0]
             parent_id = mock_strategy.get_parent_id_from_document(document)
             values, columns = mock_strategy.extract_data_for_sql(document, config)
 
-            # Step 4a: DELETE
+            # Step 4a: DELETE, one statement for every parent of the batch
             delete_table = mock_strategy.get_delete_table_name(config)
             delete_column = mock_strategy.get_delete_column_name()
-            delete_sql = f"DELETE FROM {delete_table} WHERE {delete_column} IN (%s)"
-
-            mock_cursor.execute(delete_sql, [parent_id])
-            deleted_count = mock_cursor.rowcount
+            deleted_count = PostgresRepository(mock_conn, config.summary_instance).delete_by_parent_ids(
+                delete_table, delete_column, [parent_id], commit=False
+            )
 
             assert deleted_count == 3
+            mock_cursor.execute.assert_called_once_with(
+                "DELETE FROM user_events WHERE user_id = ANY(%s)", ([parent_id],)
+            )
 
             # Step 4b: INSERT
-            actual_insertions = ImportUtils.execute_batch(
-                mock_conn, values, columns, 'user_events',
-                config.summary_instance, use_on_conflict=False, on_conflict_clause=""
+            actual_insertions = PostgresRepository(mock_conn, config.summary_instance).execute_batch(
+                values, columns, 'user_events', use_on_conflict=False, on_conflict_clause=""
             )
 
             assert actual_insertions == 2
@@ -418,45 +408,24 @@ class TestExplicitFourStepFlow:
 
         # Simulate pagination loop
         total_fetched = 0
-        offset = 0
+        after_id = None
         batch_size = 5000
 
         while True:
-            documents = mock_strategy.get_documents(mock_collection, config, offset=offset)
+            documents = mock_strategy.get_documents(mock_collection, config, after_id=after_id)
             if not documents:
                 break
 
             total_fetched += len(documents)
-            offset += batch_size
+            after_id = documents[-1]['_id']
 
             if len(documents) < batch_size:
                 break
 
         assert total_fetched == 7000  # 5000 + 2000
         assert mock_strategy.get_documents.call_count == 2
-
-    def test_skip_table_when_no_changes(self, mock_strategy):
-        """Test that tables with no changes are skipped"""
-        mock_collection = Mock()
-        mock_strategy.count_total_documents.return_value = 0
-
-        config = ImportConfig(
-            table_name='users',
-            source_collection='users',
-            after_date=datetime(2024, 1, 1),
-            summary_instance=Mock()
-        )
-
-        # Step 2
-        total_documents = mock_strategy.count_total_documents(mock_collection, config)
-
-        # Should skip when count is 0
-        if total_documents == 0:
-            # Table should be skipped
-            assert True
-        else:
-            # Should not reach here
-            assert False, "Table should have been skipped"
+        # The second page resumes after the last _id of the first one
+        assert mock_strategy.get_documents.call_args.kwargs['after_id'] == batch_returns[0][-1]['_id']
 
     def test_error_handling_during_delete(self):
         """Test error handling when DELETE fails"""
@@ -484,6 +453,226 @@ class TestExplicitFourStepFlow:
         assert mock_conn.rollback.called
 
 
+class TestSourceIndexes:
+    """Test the MongoDB indexes created at migration start"""
+
+    def test_each_source_collection_is_indexed_once(self):
+        """Every distinct mongo_collection gets a (date, _id) index per date field"""
+        from src.migration import runner
+        from src.schemas.schemas import TABLE_SCHEMAS
+
+        collections = {}
+
+        def get_collection(name):
+            return collections.setdefault(name, Mock())
+
+        with patch.object(runner, 'get_mongo_collection', get_collection):
+            runner.ensure_source_indexes()
+
+        assert set(collections) == {schema.mongo_collection for schema in TABLE_SCHEMAS.values()}
+        for collection in collections.values():
+            assert [c.args[0] for c in collection.create_index.call_args_list] == [
+                [('creation_date', 1), ('_id', 1)],
+                [('update_date', 1), ('_id', 1)],
+            ]
+
+    def test_index_failure_does_not_stop_migration(self):
+        """A source that refuses index creation is reported and skipped"""
+        from pymongo.errors import OperationFailure
+        from src.migration import runner
+
+        collection = Mock()
+        collection.create_index.side_effect = OperationFailure("not authorized")
+
+        with patch.object(runner, 'get_mongo_collection', return_value=collection):
+            runner.ensure_source_indexes()
+
+    @pytest.mark.parametrize("value, enabled", [(None, False), ('', False), ('false', False),
+                                                ('true', True), ('1', True), ('YES', True)])
+    def test_index_creation_is_opt_in(self, monkeypatch, value, enabled):
+        """The source database is only modified when CREATE_SOURCE_INDEXES is set"""
+        from src.migration import runner
+
+        if value is None:
+            monkeypatch.delenv('CREATE_SOURCE_INDEXES', raising=False)
+        else:
+            monkeypatch.setenv('CREATE_SOURCE_INDEXES', value)
+
+        with patch.object(runner, 'MIGRATION_TIERS', []), \
+                patch.object(runner, 'connect_postgres'), \
+                patch.object(runner, 'setup_tables'), \
+                patch.object(runner, 'parse_global_date_threshold', return_value=None), \
+                patch.object(runner, 'parse_batch_size', return_value=5000), \
+                patch.object(runner, 'parse_migration_workers', return_value=1), \
+                patch.object(runner, 'MongoConnection'), \
+                patch.object(runner, 'ensure_source_indexes') as ensure, \
+                patch.object(runner, 'close_postgres_connection'):
+            runner.run_migration()
+
+        assert ensure.called is enabled
+
+
+class TestParallelTiers:
+    """Test that MIGRATION_WORKERS > 1 still runs tiers one after the other"""
+
+    def test_tables_in_a_tier_do_not_reference_each_other(self):
+        """A foreign key inside one export_order pushes the referencing table to a later tier"""
+        from src.schemas.schemas import MIGRATION_TIERS, TABLE_SCHEMAS, _referenced_tables
+
+        tier_of = {key: index for index, tier in enumerate(MIGRATION_TIERS) for key in tier}
+        assert tier_of['coachings'] < tier_of['users_logbooks']
+        for tier in MIGRATION_TIERS:
+            names = {TABLE_SCHEMAS[key].name for key in tier}
+            for key in tier:
+                assert not (_referenced_tables(TABLE_SCHEMAS[key]) - {TABLE_SCHEMAS[key].name}) & names
+
+    def test_table_schemas_are_read_only(self):
+        """The cached schemas are shared by every caller, so none of them can mutate them"""
+        from src.schemas.schemas import TABLE_SCHEMAS, load_schemas
+
+        assert load_schemas() is TABLE_SCHEMAS
+        with pytest.raises(TypeError):
+            TABLE_SCHEMAS['companies'] = None
+
+    def test_parallel_workers_share_one_strategy_instance(self):
+        """Concurrent lookups of the same table build its strategy only once"""
+        from concurrent.futures import ThreadPoolExecutor
+        from src.schemas import schemas
+
+        schema = next(s for s in schemas.TABLE_SCHEMAS.values() if isinstance(s.import_strategy, str))
+        with patch.dict(schemas._STRATEGY_INSTANCES, clear=True):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                strategies = list(executor.map(lambda _: schemas.get_import_strategy(schema), range(32)))
+
+        assert len({id(strategy) for strategy in strategies}) == 1
+
+    def test_next_tier_waits_for_parallel_workers(self):
+        """Every worker of a tier finishes before any table of the next tier starts"""
+        from concurrent.futures import ThreadPoolExecutor
+        from src.migration import runner
+
+        events = []
+
+        def fake_worker(table_name, global_threshold, batch_size):
+            events.append(('start', table_name))
+            events.append(('end', table_name))
+            return table_name
+
+        def thread_pool(max_workers, mp_context):
+            return ThreadPoolExecutor(max_workers=max_workers)
+
+        with patch.object(runner, 'MIGRATION_TIERS', [['a', 'b'], ['c', 'd']]), \
+                patch.object(runner, '_migrate_table_in_worker', fake_worker), \
+                patch.object(runner, 'ProcessPoolExecutor', thread_pool), \
+                patch.object(runner, 'connect_postgres'), \
+                patch.object(runner, 'setup_tables'), \
+                patch.object(runner, 'parse_global_date_threshold', return_value=None), \
+                patch.object(runner, 'parse_batch_size', return_value=5000), \
+                patch.object(runner, 'parse_migration_workers', return_value=2), \
+                patch.object(runner, 'MongoConnection'), \
+                patch.object(runner, 'ensure_source_indexes'), \
+                patch.object(runner, 'close_postgres_connection'):
+            runner.run_migration()
+
+        last_first_tier_end = max(events.index(('end', name)) for name in ('a', 'b'))
+        first_second_tier_start = min(events.index(('start', name)) for name in ('c', 'd'))
+        assert last_first_tier_end < first_second_tier_start
+        assert {name for _, name in events} == {'a', 'b', 'c', 'd'}
+
+
+class TestTruncateBeforeImport:
+    """Test that a truncated table does not resume from its old checkpoint"""
+
+    def test_truncate_deletes_checkpoints_in_same_transaction(self):
+        """The checkpoints of the table and its cascaded children go with the TRUNCATE commit"""
+        from types import SimpleNamespace
+        from src.migration import runner
+
+        conn = Mock()
+        events = []
+        conn.cursor.return_value.execute.side_effect = lambda sql: events.append(sql)
+        conn.commit.side_effect = lambda: events.append('COMMIT')
+        schema = SimpleNamespace(force_reimport=True, truncate_before_import=True, mongo_collection='companies')
+
+        with patch.object(runner, 'get_mongo_collection'), \
+                patch.object(runner, 'export_table_data') as export, \
+                patch.object(runner, 'print_import_summary'), \
+                patch.object(runner, 'delete_sync_checkpoints',
+                             side_effect=lambda *args, **kwargs: events.append(('checkpoints', args[1], kwargs))):
+            runner.migrate_table(conn, 'companies', schema, None, 5000)
+
+        assert events == [
+            "TRUNCATE TABLE companies CASCADE",
+            ('checkpoints', 'companies', {'commit': False}),
+            'COMMIT',
+        ]
+        assert export.call_args.kwargs['after_date'] is None
+
+
+class TestConnectionOwnership:
+    """Test that the connection opened by connect_postgres() has a single owner"""
+
+    def test_close_postgres_connection_closes_connection_once(self):
+        """close_postgres_connection() closes the connection before the tunnel, exactly once"""
+        from src.connections import postgres_connection
+
+        with patch.object(postgres_connection.PostgresConnection, 'get_connection_params', return_value={}), \
+                patch.object(postgres_connection.psycopg2, 'connect') as connect:
+            conn = postgres_connection.connect_postgres()
+            postgres_connection.close_postgres_connection()
+            postgres_connection.close_postgres_connection()
+
+        assert conn is connect.return_value
+        conn.close.assert_called_once_with()
+
+    def test_worker_leaves_closing_to_close_postgres_connection(self):
+        """The worker does not close its connection itself before the module closes it again"""
+        from src.migration import runner
+
+        with patch.object(runner, 'connect_postgres') as connect, \
+                patch.object(runner, 'migrate_table'), \
+                patch.object(runner, 'MongoConnection'), \
+                patch.object(runner, 'close_postgres_connection') as close:
+            runner._migrate_table_in_worker('companies', None, 5000)
+
+        assert not connect.return_value.close.called
+        close.assert_called_once_with()
+
+
+class TestAsynchronousCommit:
+    """Test that the migration session commits without waiting for the WAL flush"""
+
+    def test_connect_postgres_can_turn_off_synchronous_commit(self):
+        """synchronous_commit=False is passed as a session startup option"""
+        from src.connections import postgres_connection
+
+        with patch.object(postgres_connection.PostgresConnection, 'get_connection_params',
+                          side_effect=lambda: {'host': 'localhost'}), \
+                patch.object(postgres_connection.psycopg2, 'connect') as connect:
+            postgres_connection.connect_postgres(synchronous_commit=False)
+            postgres_connection.connect_postgres()
+
+        assert connect.call_args_list[0].kwargs == {'host': 'localhost', 'options': '-c synchronous_commit=off'}
+        assert connect.call_args_list[1].kwargs == {'host': 'localhost'}
+
+    def test_migration_connects_with_asynchronous_commit(self):
+        """run_migration opens its connection with synchronous_commit off"""
+        from src.migration import runner
+
+        with patch.object(runner, 'MIGRATION_TIERS', []), \
+                patch.object(runner, 'connect_postgres') as connect, \
+                patch.object(runner, 'setup_tables'), \
+                patch.object(runner, 'parse_global_date_threshold', return_value=None), \
+                patch.object(runner, 'parse_batch_size', return_value=5000), \
+                patch.object(runner, 'parse_migration_workers', return_value=1), \
+                patch.object(runner, 'MongoConnection'), \
+                patch.object(runner, 'ensure_source_indexes'), \
+                patch.object(runner, 'close_postgres_connection'):
+            runner.run_migration()
+
+        connect.assert_called_once_with(synchronous_commit=False)
+
+
 class TestConsoleOutput:
     """Test console output formatting for the 4-step process"""
 
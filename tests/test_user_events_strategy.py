@@ -5,40 +5,141 @@ Tests the refactored UserEventsStrategy that extends DeleteAndInsertStrategy
 """
 
 import pytest
+from collections import namedtuple
+from dataclasses import replace
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
 from bson import ObjectId
 from datetime import datetime
 
-from src.schemas.schemas import _create_user_events_strategy
-from src.migration.import_strategies import ImportConfig, ImportUtils
+from src.migration.strategies.user_strategies import create_user_events_strategy
+from src.migration.import_strategies import ImportConfig
+from src.migration.repositories.postgres_repo import PostgresRepository
+
+
+# Extraction cases: plain ObjectIds take creation_date, embedded documents their own date
+USER_ID, EVENT_ID_1, EVENT_ID_2 = ObjectId(), ObjectId(), ObjectId()
+CREATED, UPDATED, EVENT_DATE = datetime(2024, 1, 15), datetime(2024, 1, 20), datetime(2024, 2, 1)
+ExtractCase = namedtuple('ExtractCase', ['id', 'document', 'expected_rows'])
+EXTRACT_CASES = [
+    ExtractCase(
+        'objectid_array',
+        {'_id': USER_ID, 'registered_events': [EVENT_ID_1, EVENT_ID_2],
+         'creation_date': CREATED, 'update_date': UPDATED},
+        [(str(USER_ID), str(EVENT_ID_1), CREATED, UPDATED),
+         (str(USER_ID), str(EVENT_ID_2), CREATED, UPDATED)],
+    ),
+    ExtractCase(
+        'objectid_array_without_update_date',
+        {'_id': USER_ID, 'registered_events': [EVENT_ID_1], 'creation_date': CREATED},
+        [(str(USER_ID), str(EVENT_ID_1), CREATED, CREATED)],
+    ),
+    ExtractCase(
+        'embedded',
+        {'_id': USER_ID, 'registered_events': [{'event': EVENT_ID_1, 'date': EVENT_DATE}],
+         'creation_date': CREATED, 'update_date': UPDATED},
+        [(str(USER_ID), str(EVENT_ID_1), EVENT_DATE, UPDATED)],
+    ),
+    ExtractCase(
+        'mixed',
+        {'_id': USER_ID, 'registered_events': [EVENT_ID_1, {'event': EVENT_ID_2, 'date': EVENT_DATE}],
+         'creation_date': CREATED, 'update_date': UPDATED},
+        [(str(USER_ID), str(EVENT_ID_1), CREATED, UPDATED),
+         (str(USER_ID), str(EVENT_ID_2), EVENT_DATE, UPDATED)],
+    ),
+    ExtractCase(
+        'empty',
+        {'_id': USER_ID, 'registered_events': [], 'creation_date': CREATED, 'update_date': UPDATED},
+        [],
+    ),
+    ExtractCase(
+        'missing_dates',
+        {'_id': USER_ID, 'registered_events': [EVENT_ID_1]},
+        [(str(USER_ID), str(EVENT_ID_1), None, None)],
+    ),
+]
+
+
+class FakeCursor:
+    """pymongo cursor stand-in over a list of documents, recording sort() and limit().
+
+    It has no skip(): paging by offset would fail loudly.
+    """
+
+    def __init__(self, documents):
+        self._documents = iter(documents)
+        self.sort_key = None
+        self.limit_count = None
+
+    def sort(self, key, direction):
+        self.sort_key = (key, direction)
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._documents)
+
+    def close(self):
+        pass
+
+
+class FakeCollection:
+    """MongoDB collection stand-in serving fixed documents and recording find() arguments"""
+
+    def __init__(self, documents=()):
+        self._documents = list(documents)
+        self.queries = []
+        self.cursor = None
+
+    def count_documents(self, query):
+        return len(self._documents)
+
+    def find(self, query, projection=None):
+        self.queries.append((query, projection))
+        self.cursor = FakeCursor(self._documents)
+        return self.cursor
+
+
+@pytest.fixture(scope="session")
+def strategy():
+    """UserEventsStrategy keeps no per-test state, so one instance serves every test"""
+    return create_user_events_strategy()
+
+
+@pytest.fixture(scope="module")
+def _summary_mock():
+    """Summary shared by the module's configs; no test asserts on it"""
+    return Mock()
+
+
+@pytest.fixture(scope="module")
+def import_config(_summary_mock):
+    """ImportConfig with a date filter; tests that export or change it work on a replace() copy"""
+    return ImportConfig(
+        table_name='user_events',
+        source_collection='users',
+        batch_size=5000,
+        after_date=datetime(2024, 1, 1),
+        summary_instance=_summary_mock
+    )
 
 
 class TestUserEventsStrategy:
     """Test suite for UserEventsStrategy"""
 
-    @pytest.fixture
-    def strategy(self):
-        """Create a UserEventsStrategy instance"""
-        return _create_user_events_strategy()
-
     @pytest.fixture
     def mock_collection(self):
-        """Create a mock MongoDB collection"""
-        collection = Mock()
-        collection.count_documents = Mock(return_value=2)
-        collection.find = Mock()
-        return collection
-
-    @pytest.fixture
-    def import_config(self):
-        """Create a test ImportConfig"""
-        return ImportConfig(
-            table_name='user_events',
-            source_collection='users',
-            batch_size=5000,
-            after_date=datetime(2024, 1, 1),
-            summary_instance=Mock()
-        )
+        """MongoDB collection stand-in whose count_documents query the count tests inspect"""
+        return SimpleNamespace(count_documents=Mock(return_value=2))
 
     def test_count_total_documents_with_filter(self, strategy, mock_collection, import_config):
         """Test counting documents with registered_events array"""
@@ -52,13 +153,13 @@ class TestUserEventsStrategy:
         # Verify date filter is included
         assert '$or' in call_args
 
-    def test_count_total_documents_without_date_filter(self, strategy, mock_collection):
+    def test_count_total_documents_without_date_filter(self, strategy, mock_collection, _summary_mock):
         """Test counting documents without after_date filter"""
         config = ImportConfig(
             table_name='user_events',
             source_collection='users',
             after_date=None,
-            summary_instance=Mock()
+            summary_instance=_summary_mock
         )
 
         strategy.count_total_documents(mock_collection, config)
@@ -69,130 +170,43 @@ class TestUserEventsStrategy:
         # Without after_date, the filter should not contain $or
         assert '$or' not in call_args or call_args.get('$or') is None
 
-    def test_get_documents_with_projection(self, strategy, mock_collection, import_config):
+    def test_get_documents_with_projection(self, strategy, import_config):
         """Test fetching documents with correct field projection"""
-        mock_cursor = Mock()
-        mock_cursor.skip.return_value = mock_cursor
-        mock_cursor.limit.return_value = []
-        mock_collection.find.return_value = mock_cursor
+        collection = FakeCollection()
 
-        strategy.get_documents(mock_collection, import_config, offset=0)
+        strategy.get_documents(collection, import_config)
 
         # Verify projection includes only necessary fields
-        call_args = mock_collection.find.call_args[0]
-        projection = call_args[1] if len(call_args) > 1 else {}
-
+        (query, projection), = collection.queries
         assert '_id' in projection
         assert 'registered_events' in projection
         assert 'creation_date' in projection
         assert 'update_date' in projection
 
-    def test_extract_data_for_objectid_array(self, strategy, import_config):
-        """Test extracting data when registered_events contains ObjectIds"""
-        user_id = ObjectId()
-        event_id_1 = ObjectId()
-        event_id_2 = ObjectId()
-
-        document = {
-            '_id': user_id,
-            'registered_events': [event_id_1, event_id_2],
-            'creation_date': datetime(2024, 1, 15),
-            'update_date': datetime(2024, 1, 20)
-        }
-
-        values, columns = strategy.extract_data_for_sql(document, import_config)
-
-        # Verify columns
-        assert columns == ['user_id', 'event_id', 'created_at', 'updated_at']
-
-        # Verify we got 2 rows (one per event)
-        assert len(values) == 2
-
-        # Verify first row
-        assert values[0][0] == str(user_id)  # user_id
-        assert values[0][1] == str(event_id_1)  # event_id
-        assert isinstance(values[0][2], datetime)  # created_at
-        assert isinstance(values[0][3], datetime)  # updated_at
-
-        # Verify second row
-        assert values[1][0] == str(user_id)  # user_id
-        assert values[1][1] == str(event_id_2)  # event_id
-
-    def test_extract_data_for_embedded_documents(self, strategy, import_config):
-        """Test extracting data when registered_events contains embedded documents"""
-        user_id = ObjectId()
-        event_id = ObjectId()
-
-        document = {
-            '_id': user_id,
-            'registered_events': [
-                {
-                    'event': event_id,
-                    'date': datetime(2024, 2, 1)
-                }
-            ],
-            'creation_date': datetime(2024, 1, 15),
-            'update_date': datetime(2024, 1, 20)
-        }
-
-        values, columns = strategy.extract_data_for_sql(document, import_config)
-
-        # Verify we got 1 row
-        assert len(values) == 1
-
-        # Verify the event_id was extracted from embedded document
-        assert values[0][1] == str(event_id)
-
-        # Verify the date was used from the embedded document
-        assert values[0][2] == datetime(2024, 2, 1)
-
-    def test_extract_data_for_mixed_formats(self, strategy, import_config):
-        """Test extracting data when registered_events has mixed ObjectId and embedded docs"""
-        user_id = ObjectId()
-        event_id_1 = ObjectId()
-        event_id_2 = ObjectId()
-
-        document = {
-            '_id': user_id,
-            'registered_events': [
-                event_id_1,  # Plain ObjectId
-                {
-                    'event': event_id_2,
-                    'date': datetime(2024, 2, 1)
-                }  # Embedded document
-            ],
-            'creation_date': datetime(2024, 1, 15),
-            'update_date': datetime(2024, 1, 20)
-        }
-
-        values, columns = strategy.extract_data_for_sql(document, import_config)
-
-        # Verify we got 2 rows
-        assert len(values) == 2
-
-        # First row uses creation_date (plain ObjectId)
-        assert values[0][1] == str(event_id_1)
-        assert values[0][2] == datetime(2024, 1, 15)
+        # Pages are ranges over _id, never skip() offsets
+        assert collection.cursor.sort_key == ('_id', 1)
+        assert collection.cursor.limit_count == import_config.batch_size
+        assert '_id' not in query
 
-        # Second row uses embedded document date
-        assert values[1][1] == str(event_id_2)
-        assert values[1][2] == datetime(2024, 2, 1)
+    def test_get_documents_resumes_after_last_id(self, strategy, import_config):
+        """The next page starts strictly after the last _id of the previous one"""
+        last_id = ObjectId()
+        collection = FakeCollection()
 
-    def test_extract_data_empty_events_array(self, strategy, import_config):
-        """Test extracting data when registered_events is empty"""
-        user_id = ObjectId()
+        strategy.get_documents(collection, import_config, after_id=last_id)
 
-        document = {
-            '_id': user_id,
-            'registered_events': [],
-            'creation_date': datetime(2024, 1, 15),
-            'update_date': datetime(2024, 1, 20)
-        }
+        (query, _), = collection.queries
+        assert query['_id'] == {'$gt': last_id}
+        assert query['registered_events'] == {'$exists': True, '$ne': []}
+        assert '$or' in query
 
-        values, columns = strategy.extract_data_for_sql(document, import_config)
+    @pytest.mark.parametrize("case", EXTRACT_CASES, ids=[case.id for case in EXTRACT_CASES])
+    def test_extract_data_for_sql(self, strategy, import_config, case):
+        """One row per registered event, dated by the embedded date or else the document's dates"""
+        values, columns = strategy.extract_data_for_sql(case.document, import_config)
 
-        # Should return empty batch
-        assert len(values) == 0
+        assert columns == ['user_id', 'event_id', 'created_at', 'updated_at']
+        assert values == case.expected_rows
 
     def test_get_parent_id_from_document(self, strategy):
         """Test extracting user_id from document"""
@@ -237,44 +251,33 @@ class TestUserEventsStrategy:
 
         assert isinstance(strategy, DeleteAndInsertStrategy)
 
-    def test_does_not_use_on_conflict(self, strategy):
-        """Test that strategy uses delete-and-insert instead of ON CONFLICT"""
-        # DeleteAndInsertStrategy should return False
-        assert strategy.get_use_on_conflict() is False
-
-    def test_handles_missing_dates(self, strategy, import_config):
-        """Test handling documents with missing creation/update dates"""
-        user_id = ObjectId()
-        event_id = ObjectId()
-
-        document = {
-            '_id': user_id,
-            'registered_events': [event_id],
-            # No creation_date or update_date
-        }
+    def test_upserts_on_unique_key(self, strategy, import_config):
+        """Test that user_events rows are merged with ON CONFLICT on the (user_id, event_id) key"""
+        collection = FakeCollection([{
+            '_id': ObjectId(),
+            'registered_events': [ObjectId()],
+            'creation_date': datetime(2024, 1, 15),
+            'update_date': datetime(2024, 1, 20)
+        }])
 
-        values, columns = strategy.extract_data_for_sql(document, import_config)
+        with patch.object(PostgresRepository, 'execute_batch', return_value=1) as mock_execute:
+            strategy.export_data(Mock(), collection, replace(import_config))
 
-        # Should still create row, but with None dates
-        assert len(values) == 1
-        assert values[0][0] == str(user_id)
-        assert values[0][1] == str(event_id)
-        # created_at and updated_at will be None or fallback values
+        kwargs = mock_execute.call_args.kwargs
+        assert kwargs['use_on_conflict'] is True
+        clause = kwargs['on_conflict_clause']
+        assert clause.startswith(' ON CONFLICT (user_id, event_id) DO UPDATE SET ')
+        # Unchanged relationships are left alone
+        assert 'WHERE user_events.updated_at IS DISTINCT FROM EXCLUDED.updated_at' in clause
 
     def test_full_export_cycle(self, strategy, import_config):
-        """Integration test: full export cycle with mocked database"""
+        """Integration test: full export cycle with stub MongoDB and mocked PostgreSQL"""
         user1_id = ObjectId()
         user2_id = ObjectId()
         event1_id = ObjectId()
         event2_id = ObjectId()
 
-        mock_collection = Mock()
-        mock_collection.count_documents.return_value = 2
-
-        # Mock find to return test documents
-        mock_cursor = Mock()
-        mock_cursor.skip.return_value = mock_cursor
-        mock_cursor.limit.return_value = [
+        collection = FakeCollection([
             {
                 '_id': user1_id,
                 'registered_events': [event1_id, event2_id],
@@ -287,20 +290,22 @@ class TestUserEventsStrategy:
                 'creation_date': datetime(2024, 1, 10),
                 'update_date': datetime(2024, 1, 18)
             }
-        ]
-        mock_collection.find.return_value = mock_cursor
+        ])
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = Mock()
 
-        with patch.object(ImportUtils, 'execute_batch', return_value=3) as mock_execute:
-            result = strategy.export_data(mock_conn, mock_collection, import_config)
+        # export_data records last_seen_date on its config; keep the shared one untouched
+        config = replace(import_config)
+
+        with patch.object(PostgresRepository, 'execute_batch', return_value=3) as mock_execute:
+            result = strategy.export_data(mock_conn, collection, config)
 
             # Verify execute_batch was called
             assert mock_execute.called
 
             # Verify correct number of relationships inserted (2 + 1 = 3)
-            batch_values = mock_execute.call_args[0][1]
+            batch_values = mock_execute.call_args[0][0]
             assert len(batch_values) == 3
 
             # Verify user1 has 2 events